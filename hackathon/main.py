@@ -3,7 +3,7 @@ from dotenv import load_dotenv
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
-from util import stream_response
+from util import StdoutTarget, StreamSink, format_metrics, stream_response
 
 load_dotenv()
 
@@ -26,6 +26,8 @@ output_parser = StrOutputParser()
 chain = prompt | model | output_parser
 
 result = chain.stream({"question": "안녕?"})
-stream_response(result)
+sink = StreamSink([StdoutTarget()])
+stream_response(result, sink=sink)
+print(f"\n\n⏱️ {format_metrics(sink.metrics.summary())}")
 
 
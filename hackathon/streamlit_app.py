@@ -1,10 +1,19 @@
 import os
+import sys
+import uuid
+from pathlib import Path
+
 import streamlit as st
 from dotenv import load_dotenv
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 
+# 저장소 루트의 shared 모듈(여러 앱이 같이 쓰는 LLM 호출 입장 제어) 사용
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.admission import AdmissionController, Overloaded
+from util import PlaceholderTarget, StreamSink, format_metrics
+
 # 환경 변수 로드
 load_dotenv()
 
@@ -45,12 +54,21 @@ def initialize_model():
     return chain
 
 
+@st.cache_resource
+def get_admission():
+    """모든 세션이 같이 쓰는 LLM 호출 입장 제어 (동시 호출 수 제한 + 세션 간 공정한 대기열)"""
+    return AdmissionController()
+
+
 # 모델 초기화
 chain = initialize_model()
+admission = get_admission()
 
 # 세션 상태 초기화
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# 대기열에서 세션을 구분하는 id
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
 
 # 사이드바
 with st.sidebar:
@@ -66,6 +84,13 @@ with st.sidebar:
     st.markdown("- 모델: GPT-3.5 Turbo")
     st.markdown("- 특징: 모든 답변에 '석주님' 호칭 사용")
 
+    stats = admission.stats()
+    st.markdown("---")
+    st.markdown("### 📊 호출 대기열")
+    st.markdown(f"- 실행 중: {stats['active']} / {stats['max_concurrency']}")
+    st.markdown(f"- 대기 중: {stats['queue_depth']} (최대 {stats['max_queue_depth']})")
+    st.markdown(f"- 대기 시간 p50 / p95: {stats['wait_p50']}초 / {stats['wait_p95']}초")
+
 # 메인 채팅 영역
 st.header("💬 채팅")
 
@@ -86,17 +111,25 @@ if prompt := st.chat_input("질문을 입력하세요..."):
         message_placeholder = st.empty()
         full_response = ""
 
+        # 동시 호출 수가 가득 찼으면 차례가 올 때까지 대기 (다른 세션과 번갈아 입장)
+        def show_wait(position, waited):
+            message_placeholder.markdown(f"⏳ 요청이 많아 대기 중입니다... (앞에 {position}개, {waited:.0f}초)")
+
         try:
             # 스트리밍 응답
-            with st.spinner("생각 중..."):
+            with st.spinner("생각 중..."), admission.slot(session_id, on_wait=show_wait):
                 response_stream = chain.stream({"question": prompt})
 
-                for chunk in response_stream:
-                    full_response += chunk
-                    message_placeholder.markdown(full_response + "▌")
+                # 토큰마다 다시 그리지 않고 모아서 묶어 그림 (끝나면 커서 없이 전체 응답을 그림)
+                with StreamSink([PlaceholderTarget(message_placeholder)]) as sink:
+                    sink.consume(response_stream)
+                full_response = sink.text
+            st.caption(f"⏱️ {format_metrics(sink.metrics.summary())}")
 
-                # 마지막에 커서 제거
-                message_placeholder.markdown(full_response)
+        except Overloaded as e:
+            st.warning(f"⏳ 지금은 요청이 많아 처리하지 못했습니다: {e}")
+            full_response = "죄송합니다, 석주님. 지금은 요청이 많아요. 잠시 후 다시 질문해주세요 뀨~!"
+            message_placeholder.markdown(full_response)
 
         except Exception as e:
             st.error(f"❌ 오류가 발생했습니다: {str(e)}")
@@ -1,27 +1,314 @@
+import contextvars
+import queue
+import sys
+import threading
+import time
+
 from langchain_core.messages import AIMessageChunk
 
-def stream_response(response, return_output=False):
+# 기본 배치 출력 기준: 출력하지 않은 내용이 이 시간(초)보다 오래됐거나 모인 글자 수가 이만큼이면 출력
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_FLUSH_CHARS = 256
+# 스트림을 다 읽었음을 알리는 표시
+_DONE = object()
+
+
+def _content(token):
+    """스트림 항목에서 텍스트 추출 (AIMessageChunk 또는 문자열, 그 밖은 None)"""
+    if isinstance(token, AIMessageChunk):
+        return token.content if isinstance(token.content, str) else None
+    if isinstance(token, str):
+        return token
+    return None
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def format_sse(data, event=None):
+    """Server-Sent Events 형식의 메시지 하나 (여러 줄이면 data: 줄을 여러 개로)"""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamMetrics:
+    """
+    스트림 하나의 지연 시간 지표
+
+    - ttft: 시작부터 첫 토큰까지 걸린 시간(초)
+    - tokens_per_sec: 첫 토큰 이후 초당 토큰(스트림 청크) 수
+    - gap_p50 / gap_p95 / gap_max: 토큰 사이 간격(초)
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.last_token = None
+        self.finished = None
+        self.tokens = 0
+        self.chars = 0
+        self.flushes = 0
+        self.gaps = []
+
+    def record(self, text, now=None):
+        now = now if now is not None else time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        else:
+            self.gaps.append(now - self.last_token)
+        self.last_token = now
+        self.tokens += 1
+        self.chars += len(text)
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def summary(self):
+        end = self.finished or time.perf_counter()
+        ttft = self.first_token - self.started if self.first_token is not None else None
+        generation = (self.last_token - self.first_token) if self.first_token is not None else 0.0
+        return {
+            "ttft": ttft,
+            "tokens": self.tokens,
+            "chars": self.chars,
+            "duration": end - self.started,
+            "tokens_per_sec": (self.tokens - 1) / generation if generation > 0 else 0.0,
+            "gap_p50": _percentile(self.gaps, 0.5),
+            "gap_p95": _percentile(self.gaps, 0.95),
+            "gap_max": max(self.gaps, default=0.0),
+            "flushes": self.flushes,
+        }
+
+
+def format_metrics(metrics):
+    """StreamMetrics.summary()를 사람이 읽을 수 있는 한 줄로"""
+    if metrics["ttft"] is None:
+        return "토큰 없음"
+    return (
+        f"첫 토큰 {metrics['ttft']:.2f}초 · {metrics['tokens']}토큰 {metrics['duration']:.2f}초 · "
+        f"{metrics['tokens_per_sec']:.1f} 토큰/초 · 토큰 간격 p50 {metrics['gap_p50'] * 1000:.0f}ms "
+        f"/ p95 {metrics['gap_p95'] * 1000:.0f}ms"
+    )
+
+
+class StdoutTarget:
+    """표준 출력으로 내보냄"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def close(self, full_text):
+        pass
+
+
+class FileTarget:
+    """파일에 이어 씀"""
+
+    def __init__(self, path, mode="w"):
+        self.file = open(path, mode, encoding="utf-8")
+
+    def write(self, text):
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self, full_text):
+        self.file.close()
+
+
+class SSETarget:
+    """
+    Server-Sent Events로 내보냄
+
+    send: SSE 문자열을 받는 함수 (예: 응답 스트림의 write, asyncio.Queue.put_nowait)
+    끝나면 done 이벤트를 보냄
+    """
+
+    def __init__(self, send, event="token", done_event="done"):
+        self.send = send
+        self.event = event
+        self.done_event = done_event
+
+    def write(self, text):
+        self.send(format_sse(text, self.event))
+
+    def close(self, full_text):
+        if self.done_event:
+            self.send(format_sse("", self.done_event))
+
+
+class PlaceholderTarget:
+    """Streamlit placeholder(st.empty())에 지금까지의 전체 응답을 다시 그림"""
+
+    def __init__(self, placeholder, cursor="▌"):
+        self.placeholder = placeholder
+        self.cursor = cursor
+        self._chunks = []
+
+    def write(self, text):
+        self._chunks.append(text)
+        self.placeholder.markdown("".join(self._chunks) + self.cursor)
+
+    def close(self, full_text):
+        self.placeholder.markdown(full_text)
+
+
+class StreamSink:
+    """
+    스트리밍 응답을 모아서 여러 출력 대상(target)에 묶어서 내보냄
+
+    토큰마다 문자열을 이어 붙이고 출력하는 대신 청크를 리스트에 모으고,
+    모아 둔 내용이 flush_interval초보다 오래됐거나 flush_chars글자가 모이면 한 번에 출력함 (첫 토큰은 바로 출력).
+    대상은 write(text), close(full_text) 메서드만 있으면 됨.
+
+    consume()으로 스트림을 넘기면 토큰 사이가 길어져도 다음 토큰을 기다리지 않고 제때 출력함.
+    write()를 직접 부르면 시간 기준 출력은 다음 write() 때 확인함.
+
+    사용법:
+        with StreamSink([StdoutTarget()]) as sink:
+            sink.consume(chain.stream(...))
+        sink.text, sink.metrics.summary()
+    """
+
+    def __init__(self, targets=None, flush_interval=DEFAULT_FLUSH_INTERVAL, flush_chars=DEFAULT_FLUSH_CHARS):
+        self.targets = list(targets) if targets is not None else [StdoutTarget()]
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self.metrics = StreamMetrics()
+        self._chunks = []
+        self._pending = []
+        self._pending_chars = 0
+        self._pending_since = None  # 출력하지 않은 내용 중 가장 오래된 것을 받은 시각
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def text(self):
+        """지금까지 받은 전체 응답"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def write(self, token, received_at=None):
+        """스트림 항목 하나(AIMessageChunk 또는 문자열)를 받음 (received_at: 받은 시각, 지표용)"""
+        text = _content(token)
+        if not text:
+            return
+        first = self.metrics.first_token is None
+        self.metrics.record(text, received_at)
+        self._chunks.append(text)
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_since is None:
+            self._pending_since = received_at if received_at is not None else time.perf_counter()
+        if (
+            first
+            or self._pending_chars >= self.flush_chars
+            or time.perf_counter() - self._pending_since >= self.flush_interval
+        ):
+            self.flush()
+
+    def consume(self, response):
+        """
+        스트림을 끝까지 읽으면서 write()로 넘김
+
+        스트림은 별도 스레드에서 읽고, 이 스레드는 다음 토큰을 기다리다가 모아 둔 내용이
+        flush_interval초보다 오래되면 바로 출력함. 출력은 항상 consume()을 부른 스레드에서 하므로
+        Streamlit placeholder처럼 스크립트 스레드에서만 그릴 수 있는 대상에도 쓸 수 있음.
+        """
+        items = queue.Queue()
+        stop = threading.Event()
+
+        def read():
+            try:
+                for token in response:
+                    if stop.is_set():
+                        break
+                    items.put((token, time.perf_counter()))
+            except BaseException as e:
+                items.put((_DONE, e))
+                return
+            items.put((_DONE, None))
+
+        # LangChain 설정(콜백 등)이 contextvars에 있으므로 읽는 스레드에도 그대로 넘김
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(read,), name="stream-reader", daemon=True).start()
+        try:
+            while True:
+                timeout = None
+                if self._pending:
+                    timeout = max(0.0, self._pending_since + self.flush_interval - time.perf_counter())
+                try:
+                    token, extra = items.get(timeout=timeout)
+                except queue.Empty:
+                    self.flush()
+                    continue
+                if token is _DONE:
+                    if extra is not None:
+                        raise extra
+                    return
+                self.write(token, received_at=extra)
+        finally:
+            # 출력 중 예외(Streamlit 중지 등)로 빠져나가면 읽는 스레드도 멈춤
+            stop.set()
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch = "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        self._pending_since = None
+        for target in self.targets:
+            target.write(batch)
+        self.metrics.flushes += 1
+
+    def close(self):
+        """남은 내용을 출력하고 대상을 닫음 (여러 번 불러도 한 번만 닫음)"""
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self.metrics.finish()
+        full_text = self.text
+        for target in self.targets:
+            target.close(full_text)
+
+
+def stream_response(response, return_output=False, sink=None):
     """
     AI 모델로부터의 응답을 스트리밍하여 각 청크를 처리하면서 출력합니다.
 
-    이 함수는 `response` 이터러블의 각 항목을 반복 처리합니다. 항목이 `AIMessageChunk`의 인스턴스인 경우,
-    청크의 내용을 추출하여 출력합니다. 항목이 문자열인 경우, 문자열을 직접 출력합니다. 선택적으로, 함수는
-    모든 응답 청크의 연결된 문자열을 반환할 수 있습니다.
+    이 함수는 `response` 이터러블의 각 항목을 반복 처리합니다. 항목이 `AIMessageChunk`의 인스턴스이거나
+    문자열인 경우 그 내용을 `sink`에 넘기고, `sink`는 청크를 모아 두었다가 일정 시간/글자 수마다 묶어서
+    출력합니다. 선택적으로, 함수는 모든 응답 청크의 연결된 문자열을 반환할 수 있습니다.
 
     매개변수:
     - response (iterable): `AIMessageChunk` 객체 또는 문자열일 수 있는 응답 청크의 이터러블입니다.
     - return_output (bool, optional): True인 경우, 함수는 연결된 응답 문자열을 문자열로 반환합니다. 기본값은 False입니다.
+    - sink (StreamSink, optional): 출력 대상과 지표를 담은 싱크입니다. 주지 않으면 표준 출력으로 내보냅니다.
+      스트림이 끝나면 닫히고, 첫 토큰 시간 등의 지표는 `sink.metrics.summary()`로 볼 수 있습니다.
 
     반환값:
     - str: `return_output`이 True인 경우, 연결된 응답 문자열입니다. 그렇지 않으면, 아무것도 반환되지 않습니다.
     """
-    answer = ""
-    for token in response:
-        if isinstance(token, AIMessageChunk):
-            answer += token.content
-            print(token.content, end="", flush=True)
-        elif isinstance(token, str):
-            answer += token
-            print(token, end="", flush=True)
+    if sink is None:
+        sink = StreamSink([StdoutTarget()])
+    with sink:
+        sink.consume(response)
     if return_output:
-        return answer
+        return sink.text
@@ -1,14 +1,38 @@
 from dotenv import load_dotenv
 _ = load_dotenv()
 
+import os
+
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, List
 import operator
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as ToolTimeout
 from langchain_core.messages import AnyMessage, SystemMessage, HumanMessage, ToolMessage
 from langchain_openai import ChatOpenAI
 from langchain_community.tools.tavily_search import TavilySearchResults
+from tool_cache import ToolCache
+from local_search import LocalSearchResults
+from message_compaction import MessageCompactor
+
+# SEARCH_BACKEND=local: offline BM25 search over LOCAL_SEARCH_DIR (same tool name/interface as Tavily)
+# default is where `python pipline.py data/` (run from rag_pipeline/) writes its markdown (--output-dir output)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "tavily")
+if SEARCH_BACKEND == "local":
+    tool = LocalSearchResults.from_directory(os.getenv("LOCAL_SEARCH_DIR", "../rag_pipeline/output"),
+                                             max_results=4, refresh_interval=60)
+else:
+    tool = TavilySearchResults(max_results=4)
 
-tool = TavilySearchResults(max_results=4)
+MAX_TOOL_WORKERS = 8   # tool calls running at the same time (per turn)
+TOOL_TIMEOUT = 30      # seconds, per tool call, counted from when the call starts running
+TOOL_CACHE_DB = "tool_cache.db"
+# web search results (weather, news) go stale quickly; local search is faster than the cache
+TOOL_CACHE_TTLS = {tool.name: 0 if SEARCH_BACKEND == "local" else 10 * 60}
+# search returns a list of results on success; anything else (e.g. an error string) is not cached
+TOOL_CACHE_RULES = {tool.name: lambda result: isinstance(result, list)}
+PROMPT_TOKEN_BUDGET = 6000   # per-hop prompt size, older tool outputs are shrunk to fit
 
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], operator.add]
@@ -16,8 +40,14 @@ class AgentState(TypedDict):
 
 class Agent:
 
-    def __init__(self, model, tools, system=""):
+    def __init__(self, model, tools, system="", max_workers=MAX_TOOL_WORKERS,
+                 tool_timeout=TOOL_TIMEOUT, tool_timeouts=None, cache=None, compactor=None):
         self.system = system
+        self.compactor = compactor   # MessageCompactor: keeps each prompt within a token budget
+        self.cache = cache    # ToolCache: repeated calls skip the tool (and its API quota)
+        self.tool_timeout = tool_timeout
+        self.tool_timeouts = tool_timeouts or {}  # tool name -> seconds, overrides tool_timeout
+        self.max_workers = max_workers
         graph = StateGraph(AgentState)
         graph.add_node("llm", self.call_openai)
         graph.add_node("action", self.take_action)
@@ -40,20 +70,68 @@ class Agent:
         messages = state['messages']
         if self.system:
             messages = [SystemMessage(content=self.system)] + messages
+        if self.compactor is not None:
+            messages, usage = self.compactor.compact(messages)
+            if usage['tokens_after'] < usage['tokens_before']:
+                print(f"Compacted prompt: {usage['tokens_before']} -> {usage['tokens_after']} tokens")
         message = self.model.invoke(messages)
         return {'messages': [message]}
 
+    def run_tool(self, t):
+        # returns (result, cache tier the result came from or None)
+        print(f"Calling: {t}")
+        if not t['name'] in self.tools:      # check for bad tool name from LLM
+            print("\n ....bad tool name....")
+            return "bad tool name, retry", None   # instruct LLM to retry if bad
+        if self.cache is not None:
+            hit = self.cache.get(t['name'], t['args'])
+            if hit is not None:
+                print(f"Cache hit ({hit[1]}): {t['name']}")
+                return hit
+        result = self.tools[t['name']].invoke(t['args'])
+        if self.cache is not None:
+            self.cache.put(t['name'], t['args'], result)
+        return result, None
+
     def take_action(self, state: AgentState):
+        # run all tool calls of this turn at once: the turn takes as long as the slowest call.
+        # A timed-out call can't be stopped (it's a thread) and keeps running in the background;
+        # its result is thrown away. Each turn gets its own pool so such a call never holds up
+        # the calls of later turns.
         tool_calls = state['messages'][-1].tool_calls
+        executor = ThreadPoolExecutor(max_workers=max(1, min(len(tool_calls), self.max_workers)),
+                                      thread_name_prefix="tool")
+        started = [threading.Event() for _ in tool_calls]
+        started_at = [None] * len(tool_calls)
+
+        def run(i, t):
+            started_at[i] = time.monotonic()
+            started[i].set()
+            return self.run_tool(t)
+
+        futures = [executor.submit(run, i, t) for i, t in enumerate(tool_calls)]
         results = []
-        for t in tool_calls:
-            print(f"Calling: {t}")
-            if not t['name'] in self.tools:      # check for bad tool name from LLM
-                print("\n ....bad tool name....")
-                result = "bad tool name, retry"  # instruct LLM to retry if bad
-            else:
-                result = self.tools[t['name']].invoke(t['args'])
-            results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
+        for i, (t, future) in enumerate(zip(tool_calls, futures)):   # collect in the original order
+            timeout = self.tool_timeouts.get(t['name'], self.tool_timeout)
+            cached = None
+            try:
+                # the timeout counts from when the call starts running, not from when it was queued;
+                # a call queued beyond max_workers waits at most `timeout` for a worker to free up
+                if not started[i].wait(timeout):
+                    raise ToolTimeout()
+                result, cached = future.result(timeout=max(0, started_at[i] + timeout - time.monotonic()))
+            except ToolTimeout:
+                print(f"\n ....{t['name']} timed out....")
+                result = f"tool timed out after {timeout}s, retry"
+            except Exception as e:
+                print(f"\n ....{t['name']} failed: {e}....")
+                result = f"tool error: {e}, retry"
+            metadata = {"cache_hit": cached is not None}
+            if cached is not None:
+                metadata["cache_tier"] = cached
+            results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result),
+                                       response_metadata=metadata))
+        executor.shutdown(wait=False, cancel_futures=True)
         print("Back to the model!")
         return {'messages': results}
 
@@ -65,7 +143,9 @@ If you need to look up some information before asking a follow up question, you
 """
 
 model = ChatOpenAI(model="gpt-3.5-turbo")  #reduce inference cost
-abot = Agent(model, [tool], system=prompt)
+abot = Agent(model, [tool], system=prompt, cache=ToolCache(TOOL_CACHE_DB, tool_ttls=TOOL_CACHE_TTLS,
+                                                           cacheable=TOOL_CACHE_RULES),
+             compactor=MessageCompactor(PROMPT_TOKEN_BUDGET))
 messages = [HumanMessage(content="What is the weather in Seoul? Say Korean")]
 result = abot.graph.invoke({"messages": messages})
 print(result)
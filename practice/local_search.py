@@ -0,0 +1,255 @@
+"""
+로컬 BM25 전문 검색 (TavilySearchResults 대체용)
+
+Tavily는 원격 API라서 도구 호출마다 네트워크 왕복이 들고, 부하 테스트나 외부망이 없는
+노드에서는 쓸 수 없음. 로컬 문서 모음(rag_pipeline이 만든 마크다운 등)을 단락 단위로 잘라
+역색인(inverted index)을 만들고 BM25로 순위를 매김.
+
+- LocalSearchResults는 TavilySearchResults와 이름/입력/출력 형식이 같아서 에이전트 코드를 바꾸지 않고 바꿔 끼울 수 있음
+- BM25Index.refresh()는 mtime/size가 바뀐 파일만 다시 색인하고 삭제된 파일은 색인에서 뺌
+- 한글은 형태소 분석기 없이 어절 + 글자 bigram으로 색인해서 조사가 붙어도 찾을 수 있게 함
+"""
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Optional, Type
+
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+DEFAULT_PATTERNS = ("*.md", "*.txt")
+# 단락을 이어 붙여 만드는 검색 단위(passage)의 최대 길이
+MAX_PASSAGE_CHARS = 1500
+
+_WORD = re.compile(r"\w+")
+_HANGUL = re.compile(r"[가-힣]")
+_HEADING = re.compile(r"^#{1,6}\s+(.*)")
+
+
+def tokenize(text):
+    """소문자 어절 + 한글 어절의 글자 bigram"""
+    tokens = []
+    for word in _WORD.findall(unicodedata.normalize("NFKC", text).casefold()):
+        tokens.append(word)
+        if len(word) > 2 and _HANGUL.search(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def split_passages(text, max_chars=MAX_PASSAGE_CHARS):
+    """
+    마크다운을 제목 단위 단락 묶음으로 분할
+
+    반환값: [(제목, 본문), ...]
+    """
+    passages = []
+    heading, buffer = "", []
+
+    def flush():
+        body = "\n\n".join(buffer).strip()
+        if body:
+            passages.append((heading, body))
+        buffer.clear()
+
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        match = _HEADING.match(block)
+        if match:
+            flush()
+            heading = match.group(1).strip()
+            block = block[match.end():].strip()
+            if not block:
+                continue
+        if buffer and sum(len(b) for b in buffer) + len(block) > max_chars:
+            flush()
+        buffer.append(block)
+    flush()
+    return passages
+
+
+class BM25Index:
+    """문서 디렉터리의 단락 역색인 (메모리, 파일 단위 증분 갱신)"""
+
+    def __init__(self, root=None, patterns=DEFAULT_PATTERNS, k1=1.5, b=0.75):
+        self.root = Path(root) if root is not None else None
+        self.patterns = patterns
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)  # 토큰 -> {문서 id: 빈도}
+        self._docs = {}  # 문서 id -> {"url", "title", "content", "length"}
+        self._files = {}  # 파일 경로 -> ((mtime, size), [문서 id, ...])
+        self._total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()  # 에이전트가 도구를 여러 스레드에서 동시에 호출함
+        # 파일 단위 갱신(add_file/remove_file/refresh)끼리는 한 번에 하나만 (검색은 막지 않음)
+        self._write_lock = threading.RLock()
+        if self.root is not None:
+            self.refresh()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, content, url, title=""):
+        """문서(단락) 하나를 색인하고 문서 id를 반환"""
+        tokens = tokenize(f"{title}\n{content}")
+        with self._lock:
+            doc_id = self._next_id
+            self._next_id += 1
+            for token, count in Counter(tokens).items():
+                self._postings[token][doc_id] = count
+            self._docs[doc_id] = {"url": url, "title": title, "content": content, "length": len(tokens)}
+            self._total_length += len(tokens)
+        return doc_id
+
+    def remove(self, doc_id):
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is None:
+                return
+            self._total_length -= doc["length"]
+            for token in set(tokenize(f"{doc['title']}\n{doc['content']}")):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+    def add_file(self, path):
+        """파일을 단락으로 나눠 색인 (이미 색인한 파일이면 이전 단락을 지우고 다시 색인)"""
+        path = Path(path).resolve()
+        with self._write_lock:
+            self.remove_file(path)
+            stat = path.stat()
+            text = path.read_text(encoding="utf-8", errors="replace")
+            doc_ids = [
+                self.add(body, url=f"{path.as_uri()}#{i}", title=heading or path.stem)
+                for i, (heading, body) in enumerate(split_passages(text))
+            ]
+            with self._lock:
+                self._files[path] = ((stat.st_mtime, stat.st_size), doc_ids)
+            return len(doc_ids)
+
+    def remove_file(self, path):
+        with self._write_lock:
+            with self._lock:
+                _, doc_ids = self._files.pop(Path(path).resolve(), (None, []))
+            for doc_id in doc_ids:
+                self.remove(doc_id)
+
+    def refresh(self):
+        """
+        root 디렉터리와 색인을 비교해서 바뀐 파일만 다시 색인
+        (여러 스레드가 동시에 불러도 한 번에 하나씩 실행되고, 그동안 검색은 이전 색인으로 계속 됨)
+
+        반환값: {"added": ..., "updated": ..., "removed": ...} (파일 수)
+        """
+        report = {"added": 0, "updated": 0, "removed": 0}
+        if self.root is None:
+            return report
+        with self._write_lock:
+            current = {}
+            for pattern in self.patterns:
+                for path in self.root.rglob(pattern):
+                    try:
+                        if path.is_file():
+                            stat = path.stat()
+                            current[path.resolve()] = (stat.st_mtime, stat.st_size)
+                    except FileNotFoundError:  # 목록을 읽는 사이에 지워진 파일
+                        continue
+
+            with self._lock:
+                indexed_files = {path: signature for path, (signature, _) in self._files.items()}
+            for path in indexed_files:
+                if path not in current:
+                    self.remove_file(path)
+                    report["removed"] += 1
+            for path, signature in current.items():
+                indexed = indexed_files.get(path)
+                if indexed is None:
+                    report["added"] += 1
+                elif indexed != signature:
+                    report["updated"] += 1
+                else:
+                    continue
+                try:
+                    self.add_file(path)
+                except FileNotFoundError:
+                    # 목록을 읽은 뒤 색인하기 전에 지워진 파일은 색인에서 뺀 채로 둠
+                    self.remove_file(path)
+            return report
+
+    def search(self, query, k=4):
+        """
+        BM25 상위 k개 단락
+
+        반환값: [{"url", "title", "content", "score"}, ...]
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not terms:
+                return []
+            avgdl = self._total_length / n
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._docs[doc_id]["length"] / avgdl)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "url": self._docs[doc_id]["url"],
+                    "title": self._docs[doc_id]["title"],
+                    "content": self._docs[doc_id]["content"],
+                    "score": round(score, 4),
+                }
+                for doc_id, score in best
+            ]
+
+
+class LocalSearchInput(BaseModel):
+    query: str = Field(description="search query to look up")
+
+
+class LocalSearchResults(BaseTool):
+    """TavilySearchResults와 같은 이름/인터페이스의 로컬 BM25 검색 도구"""
+
+    name: str = "tavily_search_results_json"
+    description: str = (
+        "A search engine optimized for comprehensive, accurate, and trusted results. "
+        "Useful for when you need to answer questions about current events. "
+        "Input should be a search query."
+    )
+    args_schema: Type[BaseModel] = LocalSearchInput
+    index: Any
+    max_results: int = 4
+    # 0보다 크면 마지막 갱신 후 이 시간(초)이 지난 첫 검색 때 index.refresh()를 호출
+    refresh_interval: float = 0
+    last_refresh: float = 0
+    # 갱신 시각 확인/기록과 refresh()를 한 스레드만 하도록 (나머지는 기다렸다가 갱신된 색인으로 검색)
+    _refresh_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_directory(cls, root, patterns=DEFAULT_PATTERNS, **kwargs):
+        return cls(index=BM25Index(root, patterns=patterns), last_refresh=time.monotonic(), **kwargs)
+
+    def _run(self, query: str, run_manager: Optional[Any] = None):
+        if self.refresh_interval > 0:
+            with self._refresh_lock:
+                if time.monotonic() - self.last_refresh >= self.refresh_interval:
+                    self.last_refresh = time.monotonic()
+                    self.index.refresh()
+        return self.index.search(query, k=self.max_results)
@@ -0,0 +1,163 @@
+"""
+에이전트 프롬프트 토큰 예산 관리 (메시지 압축)
+
+AgentState.messages는 operator.add로 계속 늘어나고, 검색 결과 전체가 ToolMessage에 들어가며
+call_openai는 매 hop마다 전체 목록을 다시 보냄. 긴 리서치 세션에서 hop당 프롬프트 크기와
+지연 시간이 계속 커지지 않도록 모델에 보내기 직전에 메시지 목록을 예산에 맞게 줄임.
+(상태에 쌓인 원래 메시지는 건드리지 않고 모델에 보내는 목록만 줄임)
+
+순서:
+1) 최근 keep_recent_turns개 도구 턴(도구 호출 AIMessage + 그 ToolMessage들)은 그대로 둠
+2) 오래된 도구 결과에서 더 최근 결과에 이미 나온 항목(같은 url)이나 같은 내용을 뺌
+3) 그래도 예산을 넘으면 오래된 도구 결과부터 요약(summarize를 준 경우) 또는 앞부분만 남기고 자름
+4) 그래도 넘으면 오래된 도구 결과부터 생략 표시로 바꿈
+
+ToolMessage 자체는 지우지 않음 (OpenAI API는 tool_call_id마다 ToolMessage가 있어야 함).
+"""
+import ast
+import threading
+from functools import lru_cache
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+DEFAULT_TOKEN_BUDGET = 6000
+DEFAULT_KEEP_RECENT_TURNS = 1
+# 오래된 도구 결과를 자를 때 남기는 토큰 수
+DEFAULT_SNIPPET_TOKENS = 200
+# 메시지 하나에 붙는 역할/구분자 토큰 (대략값)
+_MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def tiktoken_counter(model="gpt-3.5-turbo"):
+    """tiktoken으로 토큰 수를 세는 함수"""
+    encoding = _encoding(model)
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _text(message):
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+
+def _parse_results(text):
+    """str(검색 결과 목록)을 다시 dict 목록으로 (형식이 다르면 None)"""
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+    if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+        return value
+    return None
+
+
+class MessageCompactor:
+    """모델에 보낼 메시지 목록을 토큰 예산 안으로 줄임"""
+
+    def __init__(
+        self,
+        budget=DEFAULT_TOKEN_BUDGET,
+        keep_recent_turns=DEFAULT_KEEP_RECENT_TURNS,
+        snippet_tokens=DEFAULT_SNIPPET_TOKENS,
+        count_tokens=None,
+        summarize=None,
+    ):
+        self.budget = budget
+        self.keep_recent_turns = keep_recent_turns
+        self.snippet_tokens = snippet_tokens
+        self.count_tokens = count_tokens or tiktoken_counter()
+        # summarize(text) -> 요약 문자열. 같은 도구 결과는 한 번만 요약하도록 tool_call_id로 보관
+        self.summarize = summarize
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def _tokens(self, message):
+        return self.count_tokens(_text(message)) + _MESSAGE_OVERHEAD
+
+    def _recent_start(self, messages):
+        """그대로 둘 최근 도구 턴이 시작하는 위치"""
+        start = len(messages)
+        turns = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if turns >= self.keep_recent_turns:
+                break
+            if isinstance(messages[i], AIMessage) and messages[i].tool_calls:
+                start = i
+                turns += 1
+        return start
+
+    def _dedupe(self, messages, old):
+        """오래된 도구 결과에서 더 최근 결과에 이미 있는 항목/내용을 뺌"""
+        seen_urls, seen_texts = set(), set()
+        for i in range(len(messages) - 1, -1, -1):
+            message = messages[i]
+            if not isinstance(message, ToolMessage):
+                continue
+            text = _text(message)
+            results = _parse_results(text)
+            if i in old:
+                if text in seen_texts:
+                    messages[i] = message.model_copy(update={"content": "[same result as a later call]"})
+                elif results is not None:
+                    kept = [item for item in results if item.get("url") not in seen_urls]
+                    if len(kept) < len(results):
+                        content = str(kept) if kept else "[all results repeated in a later call]"
+                        messages[i] = message.model_copy(update={"content": content})
+            seen_texts.add(text)
+            if results is not None:
+                seen_urls.update(item["url"] for item in results if item.get("url"))
+
+    def _shrink(self, message, tokens):
+        """도구 결과 하나를 요약하거나 앞부분만 남김"""
+        text = _text(message)
+        if self.summarize is not None:
+            with self._lock:
+                summary = self._summaries.get(message.tool_call_id)
+            if summary is None:
+                summary = self.summarize(text)
+                with self._lock:
+                    self._summaries[message.tool_call_id] = summary
+            return message.model_copy(update={"content": f"[summary] {summary}"})
+        keep_chars = int(len(text) * self.snippet_tokens / max(tokens, 1))
+        return message.model_copy(
+            update={"content": f"{text[:keep_chars]} ... [truncated {tokens - self.snippet_tokens} tokens]"}
+        )
+
+    def compact(self, messages):
+        """
+        예산에 맞게 줄인 메시지 목록을 반환 (원래 목록은 바꾸지 않음)
+
+        반환값: (메시지 목록, {"tokens_before", "tokens_after"})
+        """
+        messages = list(messages)
+        before = sum(self._tokens(m) for m in messages)
+        if before <= self.budget:
+            return messages, {"tokens_before": before, "tokens_after": before}
+
+        recent_start = self._recent_start(messages)
+        old = {i for i in range(recent_start) if isinstance(messages[i], ToolMessage)}
+        self._dedupe(messages, old)
+        counts = [self._tokens(m) for m in messages]
+
+        for i in sorted(old):
+            if sum(counts) <= self.budget:
+                break
+            if counts[i] > self.snippet_tokens + _MESSAGE_OVERHEAD:
+                messages[i] = self._shrink(messages[i], counts[i] - _MESSAGE_OVERHEAD)
+                counts[i] = self._tokens(messages[i])
+        for i in sorted(old):
+            if sum(counts) <= self.budget:
+                break
+            messages[i] = messages[i].model_copy(update={"content": "[old tool output omitted]"})
+            counts[i] = self._tokens(messages[i])
+
+        return messages, {"tokens_before": before, "tokens_after": sum(counts)}
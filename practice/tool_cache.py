@@ -0,0 +1,176 @@
+"""
+도구 호출 결과 캐시
+
+리서치 에이전트는 턴마다, 사용자마다 같은 검색("weather in Seoul")을 반복해서
+검색 API 할당량과 시간을 낭비함. 도구 이름 + 정규화한 인자를 키로 결과를 저장해 두고
+TTL 안에 같은 호출이 오면 도구를 실행하지 않고 저장된 결과를 돌려줌.
+
+- 메모리 계층: 최근에 쓴 max_items개를 LRU로 보관
+- SQLite 계층(선택): db_path를 주면 프로세스를 다시 시작해도, 여러 프로세스에서도 결과를 같이 씀
+- TTL은 도구별로 다르게 줄 수 있음 (tool_ttls, 0이면 그 도구는 캐시하지 않음)
+- 성공한 결과만 저장함: 도구별 cacheable(result) 조건을 줄 수 있고, 조건이 없으면
+  오류처럼 보이는 결과(예외 대신 돌려준 repr(e), "Error: ..." 문자열)는 저장하지 않음
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_ITEMS = 1024
+
+# repr(HTTPError(...)), "Error: ...", "Traceback ..." 같은 오류 결과
+_ERROR_TEXT = re.compile(r"^\s*(?:\w*(?:Error|Exception)\s*\(|(?:error|exception|traceback)\b)", re.IGNORECASE)
+
+
+def looks_like_error(result):
+    """도구가 예외 대신 돌려준 오류 결과인지 (빈 결과도 저장하지 않도록 True)"""
+    if result is None or result == "" or result == []:
+        return True
+    if isinstance(result, BaseException):
+        return True
+    return isinstance(result, str) and bool(_ERROR_TEXT.match(result))
+
+
+def _normalize(value):
+    """공백/대소문자/유니코드 표기 차이와 dict 키 순서를 없앰"""
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split()).casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(tool_name, args):
+    """도구 이름 + 정규화한 인자의 sha256"""
+    payload = json.dumps({"tool": tool_name, "args": _normalize(args)}, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolCache:
+    """LRU 메모리 + (선택) SQLite 두 계층 TTL 캐시"""
+
+    def __init__(
+        self,
+        db_path=None,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        tool_ttls=None,
+        max_items=DEFAULT_MAX_ITEMS,
+        cacheable=None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.tool_ttls = tool_ttls or {}
+        # 도구 이름 -> cacheable(result) 조건 (없으면 오류처럼 보이지 않는 결과만 저장)
+        self.cacheable = cacheable or {}
+        self.skipped = 0
+        self.max_items = max_items
+        self.hits = {"memory": 0, "sqlite": 0}
+        self.misses = 0
+        self._memory = OrderedDict()  # 키 -> (만료 시각, 결과)
+        self._lock = threading.Lock()  # 에이전트가 도구를 여러 스레드에서 동시에 실행함
+        self._conn = None
+        if db_path is not None:
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_cache (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    def ttl_for(self, tool_name):
+        return self.tool_ttls.get(tool_name, self.ttl_seconds)
+
+    def is_cacheable(self, tool_name, result):
+        if looks_like_error(result):
+            return False
+        predicate = self.cacheable.get(tool_name)
+        return predicate is None or bool(predicate(result))
+
+    def _remember(self, key, expires_at, result):
+        """메모리 계층에 저장 (self._lock 안에서 호출)"""
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, tool_name, args):
+        """
+        캐시된 도구 결과 조회
+
+        반환값: (결과, "memory" 또는 "sqlite") 또는 None
+        """
+        if self.ttl_for(tool_name) <= 0:
+            return None
+        key = cache_key(tool_name, args)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return entry[1], "memory"
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT result, expires_at FROM tool_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, row[1], result)
+                    self.hits["sqlite"] += 1
+                    return result, "sqlite"
+
+            self.misses += 1
+            return None
+
+    def put(self, tool_name, args, result):
+        """도구 결과 저장 (오류 결과는 저장하지 않고, JSON으로 바꿀 수 없는 결과는 메모리 계층에만 저장)"""
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0:
+            return
+        if not self.is_cacheable(tool_name, result):
+            with self._lock:
+                self.skipped += 1
+            return
+        key = cache_key(tool_name, args)
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, result)
+            if self._conn is None:
+                return
+            try:
+                payload = json.dumps(result, ensure_ascii=False)
+            except (TypeError, ValueError):
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, tool, result, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tool_name, payload, expires_at),
+            )
+            self._conn.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),))
+
+    def stats(self):
+        """계층별 적중 횟수와 적중률"""
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.hits["memory"],
+            "sqlite_hits": self.hits["sqlite"],
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -3,18 +3,48 @@
 """
 import streamlit as st
 import os
+import sys
+import time
+import uuid
+from collections import deque
+from pathlib import Path
 from dotenv import load_dotenv
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
 OPEN_AI_KEY = os.getenv("OPENAI_API_KEY")
+# 퀴즈 메모리를 저장할 SQLite 파일 (재시작해도 유지됨)
+MEMORY_DB_PATH = os.getenv("QUIZ_MEMORY_DB", str(Path(__file__).parent / "quiz_memory.db"))
+# 사용자별 메모리 샤드(SQLite 파일)를 저장할 디렉터리
+MEMORY_SHARD_DIR = os.getenv("QUIZ_MEMORY_SHARDS", str(Path(__file__).parent / "quiz_memory_shards"))
+# 마지막 사용 후 메모리 보관 기간(분)과 사용자당 최대 메모리 항목 수
+MEMORY_TTL_MINUTES = int(os.getenv("QUIZ_MEMORY_TTL_MINUTES", 60 * 24 * 30))
+MEMORY_MAX_ITEMS_PER_USER = int(os.getenv("QUIZ_MEMORY_MAX_ITEMS", 500))
+# 만료/초과 메모리를 정리하는 주기(초)
+MEMORY_SWEEP_INTERVAL = 600
+# 게임별 질문/답변 메모리를 요약 하나로 합치는 주기(초)와 조건
+# (마지막 저장 후 COMPACT_IDLE_MINUTES가 지난 게임, 또는 요약 안 된 항목이 COMPACT_MAX_ITEMS개 이상인 게임)
+MEMORY_COMPACT_INTERVAL = 1800
+COMPACT_IDLE_MINUTES = 30
+COMPACT_MAX_ITEMS = 40
+# LLM에 보낼 최근 대화의 최대 토큰 수 (오래된 질문/답변은 메모리 도구로 찾음)
+HISTORY_TOKEN_LIMIT = 2000
+
+# 저장소 루트의 shared 모듈(여러 앱이 같이 쓰는 LLM 호출 입장 제어) 사용
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 try:
-    from langchain_openai import ChatOpenAI
+    from langchain_core.messages import AIMessageChunk
+    from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from langgraph.checkpoint.sqlite import SqliteSaver
     from langgraph.prebuilt import create_react_agent
-    from langgraph.store.memory import InMemoryStore
     from langmem import create_manage_memory_tool, create_search_memory_tool
+    from embedding_cache import CachedEmbeddings
+    from store import CachedStore, ShardedStore, create_sqlite_connection
+    from compaction import format_report, start_compactor
+    from shared.admission import AdmissionController, Overloaded
 except ImportError as e:
     st.error(f"필요한 패키지가 설치되지 않았습니다: {e}")
     st.stop()
@@ -37,9 +67,11 @@ with st.sidebar:
 
     if st.button("🗑️ 메모리 초기화"):
         # 세션 상태 초기화
-        for key in ['messages', 'agent', 'store']:
+        for key in ['messages', 'agent', 'store', 'embeddings', 'game_id']:
             if key in st.session_state:
                 del st.session_state[key]
+        # 대화 스레드(체크포인트)는 에이전트를 다시 불러온 뒤에 삭제
+        st.session_state.reset_thread = f"quiz_{user_name}"
         st.success("메모리가 초기화되었습니다!")
         st.rerun()
 
@@ -48,20 +80,46 @@ with st.sidebar:
 def create_agent():
     """메모리 에이전트 생성 (캐싱)"""
     try:
-        # 메모리 저장소 설정
-        store = InMemoryStore(
+        # 임베딩 캐시 - 매 턴 반복되는 search_memory 질의를 다시 임베딩하지 않도록 함
+        embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPEN_AI_KEY),
+            model_name="openai:text-embedding-3-small",
+            db_path=MEMORY_DB_PATH,
+        )
+
+        # 메모리 저장소 설정 - 사용자별 SQLite(sqlite-vec) 샤드에 영구 저장하고 자주 읽는 항목만 메모리에 캐시
+        sharded_store = ShardedStore(
+            MEMORY_SHARD_DIR,
             index={
                 "dims": 1536,
-                "embed": "openai:text-embedding-3-small",
-            }
+                "embed": embeddings,
+            },
+            ttl_minutes=MEMORY_TTL_MINUTES,
+            max_items_per_tenant=MEMORY_MAX_ITEMS_PER_USER,
+        )
+        store = CachedStore(sharded_store)
+        # 만료/초과 항목이 지워지면 캐시에 남은 항목도 버림
+        sharded_store.start_sweeper(MEMORY_SWEEP_INTERVAL, on_sweep=lambda removed: store.clear())
+
+        # 게임별로 쌓인 질문/답변 메모리를 요약 하나로 합쳐서 검색 대상과 프롬프트 크기를 일정하게 유지
+        compaction_log = get_compaction_log()
+        start_compactor(
+            sharded_store,
+            store,
+            ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPEN_AI_KEY),
+            interval_seconds=MEMORY_COMPACT_INTERVAL,
+            on_compact=lambda reports: compaction_log.append(format_report(reports)),
+            idle_minutes=COMPACT_IDLE_MINUTES,
+            max_items=COMPACT_MAX_ITEMS,
         )
 
         # LLM 초기화
         llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, api_key=OPEN_AI_KEY)
 
-        # 메모리 도구 생성
-        manage_memory_tool = create_manage_memory_tool(namespace=("quiz_memory",))
-        search_memory_tool = create_search_memory_tool(namespace=("quiz_memory",))
+        # 메모리 도구 생성 - 사용자마다 별도 namespace(샤드)를 사용 ({user_id}, {game_id}는 config에서 채워짐)
+        # 저장은 게임별 namespace에 하고, 검색은 그 사용자의 모든 게임(요약 포함)을 대상으로 함
+        manage_memory_tool = create_manage_memory_tool(namespace=("quiz_memory", "{user_id}", "{game_id}"))
+        search_memory_tool = create_search_memory_tool(namespace=("quiz_memory", "{user_id}"))
         memory_tools = [manage_memory_tool, search_memory_tool]
 
         system_prompt = """당신은 LangMem 메모리 기능을 사용하는 퀴즈 맞추기 AI 에이전트입니다.
@@ -70,6 +128,7 @@ def create_agent():
                         
                         - `manage_memory`: 당신이 한 **질문**과 사용자의 **답변**을 저장하거나 수정, 삭제할 때 사용합니다.
                         - `search_memory`: 이전에 저장한 질문과 답변을 검색하여 유사하거나 중복되지 않도록 할 때 사용합니다.
+                          지난 게임의 질문/답변은 게임별로 하나의 요약 메모로 합쳐져 있을 수 있습니다.
                         
                         🎯 목표:
                         - 사용자가 "시작"이라고 말하면 퀴즈를 시작합니다.
@@ -91,33 +150,108 @@ def create_agent():
                         
                         당신은 친근하고 호기심 많은 퀴즈 호스트처럼 행동해야 합니다. 대화를 즐겁게 이끌어가세요!"""
 
+        # 대화 상태 저장소 - thread_id별로 메시지 히스토리를 SQLite에 저장해서
+        # 매 턴 새 메시지만 보내도 이전 대화가 이어지고, 재시작/새로고침 후에도 유지됨
+        checkpointer = SqliteSaver(create_sqlite_connection(MEMORY_DB_PATH))
+        checkpointer.setup()
+
+        def trim_history(state):
+            """저장된 히스토리는 그대로 두고 LLM에는 최근 대화만 보내서 프롬프트 크기를 일정하게 유지"""
+            recent = trim_messages(
+                state["messages"],
+                strategy="last",
+                token_counter=count_tokens_approximately,
+                max_tokens=HISTORY_TOKEN_LIMIT,
+                start_on="human",
+                end_on=("human", "tool"),
+            )
+            if not recent:
+                # 마지막 사용자 메시지 하나만으로 한도를 넘으면 trim 결과가 비어서 시스템 프롬프트만 가게 되므로
+                # 그 메시지(와 그 뒤의 도구 호출/결과)는 항상 보냄
+                last_human = next(
+                    (i for i in range(len(state["messages"]) - 1, -1, -1) if state["messages"][i].type == "human"),
+                    None,
+                )
+                if last_human is not None:
+                    recent = state["messages"][last_human:]
+            return {"llm_input_messages": recent}
+
         # 에이전트 생성 - 시스템 프롬프트를 직접 전달
         agent = create_react_agent(
             llm,
             tools=memory_tools,
             store=store,
+            checkpointer=checkpointer,
+            pre_model_hook=trim_history,
             prompt=system_prompt
         )
 
-        return agent, store
+        return agent, store, embeddings
 
     except Exception as e:
         st.error(f"에이전트 초기화 실패: {e}")
-        return None, None
+        return None, None, None
+
+
+@st.cache_resource
+def get_compaction_log():
+    """최근 메모리 압축 결과 (모든 세션 공유)"""
+    return deque(maxlen=10)
+
+
+@st.cache_resource
+def get_admission():
+    """모든 세션이 같이 쓰는 LLM 호출 입장 제어 (동시 호출 수 제한 + 세션 간 공정한 대기열)"""
+    return AdmissionController()
 
 
+admission = get_admission()
+# 대기열에서 세션을 구분하는 id
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
 # 에이전트 초기화
 if 'agent' not in st.session_state:
     with st.spinner("🤖 챗봇을 초기화하는 중..."):
-        agent, store = create_agent()
+        agent, store, embeddings = create_agent()
         if agent:
             st.session_state.agent = agent
             st.session_state.store = store
+            st.session_state.embeddings = embeddings
             st.success("✅ 챗봇이 준비되었습니다!")
         else:
             st.error("❌ 챗봇 초기화에 실패했습니다.")
             st.stop()
 
+# 현재 게임 id - 게임별로 질문/답변 메모리를 모았다가 나중에 요약으로 압축함
+game_id = st.session_state.setdefault("game_id", str(int(time.time())))
+
+# 사용자별 대화 스레드 설정 (체크포인터와 메모리 도구에서 사용)
+config = {
+    "configurable": {
+        "user_id": user_name,
+        "thread_id": f"quiz_{user_name}",
+        "game_id": game_id,
+    }
+}
+
+# 초기화 버튼을 누른 경우 저장된 대화 스레드 삭제
+if reset_thread := st.session_state.pop("reset_thread", None):
+    st.session_state.agent.checkpointer.delete_thread(reset_thread)
+
+
+def load_thread_messages():
+    """체크포인트에 저장된 대화에서 화면에 보여줄 사용자/AI 메시지만 가져옴"""
+    snapshot = st.session_state.agent.get_state(config)
+    messages = []
+    for msg in snapshot.values.get("messages", []):
+        # 도구 호출/도구 결과 메시지는 화면에 보여주지 않음
+        if msg.type == "human":
+            messages.append({"role": "user", "content": msg.content})
+        elif msg.type == "ai" and msg.content and not msg.tool_calls:
+            messages.append({"role": "assistant", "content": msg.content})
+    return messages
+
+
 # 메시지 히스토리 초기화
 if 'messages' not in st.session_state:
     st.session_state.messages = [
@@ -125,7 +259,7 @@ if 'messages' not in st.session_state:
             "role": "assistant",
             "content": f"안녕하세요 {user_name}님! 🎯 퀴즈 맞추기 게임을 해보세요!\n\n마음속으로 무언가를 생각하시고 **'시작'**이라고 입력해주세요. 제가 질문으로 맞춰보겠습니다! 🤖"
         }
-    ]
+    ] + load_thread_messages()
 
 # 채팅 메시지 표시
 for message in st.session_state.messages:
@@ -134,68 +268,90 @@ for message in st.session_state.messages:
 
 # 사용자 입력 처리
 if user_input := st.chat_input("메시지를 입력하세요..."):
+    # "시작"이면 새 게임으로 보고 게임 id를 새로 발급
+    if user_input.strip() == "시작":
+        st.session_state.game_id = config["configurable"]["game_id"] = str(int(time.time()))
+
     # 사용자 메시지 추가
     st.session_state.messages.append({"role": "user", "content": user_input})
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    # 어시스턴트 응답 생성
+    # 어시스턴트 응답 생성 - 토큰이 생성되는 대로 바로 화면에 표시
     with st.chat_message("assistant"):
-        with st.spinner("생각 중..."):
-            try:
-                # 사용자 ID 설정 (메모리 도구에서 사용)
-                config = {
-                    "configurable": {
-                        "user_id": user_name,
-                        "thread_id": f"quiz_{user_name}"
-                    }
-                }
-
-                # 전체 대화 히스토리를 포함해서 에이전트에 전달
-                conversation_messages = []
-
-                # 최근 대화 히스토리 포함 (최대 10개 메시지)
-                recent_messages = st.session_state.messages[-10:]
-                for msg in recent_messages:
-                    conversation_messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
-
-                # 현재 사용자 입력 추가
-                conversation_messages.append({
-                    "role": "user",
-                    "content": user_input
-                })
-
-                # 에이전트 호출 - 전체 대화 히스토리 포함
-                response = st.session_state.agent.invoke(
-                    {"messages": conversation_messages},
-                    config=config
-                )
-
-                # 응답 추출
-                if response and "messages" in response and len(response["messages"]) > 0:
-                    # 마지막 AI 메시지 가져오기
-                    assistant_message = response["messages"][-1].content
-                else:
-                    assistant_message = "죄송합니다. 응답을 생성하는데 문제가 발생했습니다."
-
-                st.markdown(assistant_message)
-
-                # 메시지 히스토리에 추가
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": assistant_message
-                })
-
-            except Exception as e:
-                error_message = f"오류가 발생했습니다: {str(e)}"
-                st.error(error_message)
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": f"죄송합니다. 처리 중 오류가 발생했습니다. 다시 시도해주세요."
-                })
+        tool_placeholder = st.empty()
+        message_placeholder = st.empty()
+        message_placeholder.markdown("생각 중... ▌")
+        try:
+            assistant_message = ""
+            tool_progress = {}  # tool_call_id -> 진행 상황 표시 문자열
+
+            # 동시 호출 수가 가득 찼으면 차례가 올 때까지 대기 (다른 세션과 번갈아 입장)
+            def show_wait(position, waited):
+                message_placeholder.markdown(f"⏳ 요청이 많아 대기 중입니다... (앞에 {position}개, {waited:.0f}초)")
+
+            with admission.slot(session_id, on_wait=show_wait):
+                message_placeholder.markdown("생각 중... ▌")
+                # 에이전트 호출 - 이전 대화는 체크포인터가 thread_id로 이어주므로 새 메시지만 전달
+                # messages 모드로 LLM 토큰을, updates 모드로 도구 호출/완료를 받음
+                for mode, data in st.session_state.agent.stream(
+                    {"messages": [{"role": "user", "content": user_input}]},
+                    config=config,
+                    stream_mode=["messages", "updates"],
+                ):
+                    if mode == "messages":
+                        chunk, metadata = data
+                        if (
+                            metadata.get("langgraph_node") == "agent"
+                            and isinstance(chunk, AIMessageChunk)
+                            and isinstance(chunk.content, str)
+                            and chunk.content
+                        ):
+                            assistant_message += chunk.content
+                            message_placeholder.markdown(assistant_message + "▌")
+                        continue
+
+                    for update in data.values():
+                        for msg in (update or {}).get("messages", []):
+                            if getattr(msg, "tool_calls", None):
+                                # 도구를 부르기 전에 나온 텍스트는 최종 답변이 아니므로 비움
+                                assistant_message = ""
+                                message_placeholder.markdown("생각 중... ▌")
+                                for call in msg.tool_calls:
+                                    tool_progress[call["id"]] = f"🔧 `{call['name']}` 실행 중..."
+                            elif msg.type == "tool":
+                                tool_progress[msg.tool_call_id] = f"✅ `{msg.name}` 완료"
+                    if tool_progress:
+                        tool_placeholder.caption("  \n".join(tool_progress.values()))
+
+            if not assistant_message:
+                assistant_message = "죄송합니다. 응답을 생성하는데 문제가 발생했습니다."
+
+            message_placeholder.markdown(assistant_message)
+
+            # 메시지 히스토리에 추가
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": assistant_message
+            })
+
+        except Overloaded as e:
+            # 과부하일 때는 OpenAI를 호출하지 않고 바로 안내 (대화는 저장되지 않으므로 같은 메시지를 다시 보내면 됨)
+            message_placeholder.empty()
+            st.warning(f"⏳ 지금은 요청이 많아 처리하지 못했습니다: {e}")
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": "지금은 요청이 많아요. 잠시 후 같은 메시지를 다시 보내주세요."
+            })
+
+        except Exception as e:
+            error_message = f"오류가 발생했습니다: {str(e)}"
+            message_placeholder.empty()
+            st.error(error_message)
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": f"죄송합니다. 처리 중 오류가 발생했습니다. 다시 시도해주세요."
+            })
 
 # 하단 정보
 st.markdown("---")
@@ -230,6 +386,14 @@ if st.checkbox("🔍 디버그 정보 보기"):
     st.write(f"- 메시지 수: {len(st.session_state.messages)}")
     st.write(f"- 에이전트 상태: {'✅ 초기화됨' if 'agent' in st.session_state else '❌ 미초기화'}")
     st.write(f"- 사용자 이름: {user_name}")
+    if 'store' in st.session_state:
+        st.write(f"- 메모리 캐시: {st.session_state.store.stats()}")
+        st.write(f"- 내 메모리 사용량: {st.session_state.store.store.tenant_stats(user_name)}")
+    if 'embeddings' in st.session_state:
+        st.write(f"- 임베딩 캐시: {st.session_state.embeddings.stats()}")
+    st.write(f"- LLM 호출 대기열: {admission.stats()}")
+    for line in get_compaction_log():
+        st.write(f"- {line}")
 
     if st.checkbox("📜 전체 대화 히스토리 보기"):
         for i, msg in enumerate(st.session_state.messages):
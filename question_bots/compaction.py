@@ -0,0 +1,153 @@
+"""
+퀴즈 메모리 압축(compaction)
+
+manage_memory는 질문/답변 한 쌍을 메모리 항목 하나로 저장하기 때문에 게임을 오래 하면
+작은 항목이 수백 개 쌓이고 search_memory가 매 턴 그 전부를 놓고 순위를 매겨야 함.
+여기서는 게임 하나(namespace ("quiz_memory", 사용자 id, 게임 id))의 질문/답변 항목들을
+LLM으로 요약한 항목 하나(key="summary")로 합치고 원래 항목은 지움.
+요약 항목은 store.put()으로 다시 저장되므로 새로 임베딩됨.
+
+압축 대상:
+- 끝난 게임: 마지막 저장 후 idle_minutes가 지난 게임 (질문/답변이 min_items개 이상)
+- 진행 중인 긴 게임: 요약되지 않은 항목이 max_items개 이상인 게임
+"""
+import threading
+from datetime import datetime, timezone
+
+MEMORY_PREFIX = "quiz_memory"
+SUMMARY_KEY = "summary"
+# 게임 하나에서 한 번에 읽어오는 최대 항목 수
+_MAX_GAME_ITEMS = 1000
+
+_SUMMARY_PROMPT = """다음은 스무고개 퀴즈 게임 한 판에서 AI가 한 질문과 사용자의 답변 기록입니다.
+이 기록을 나중에 같은 질문을 반복하지 않는 데 쓸 수 있도록 하나의 메모로 정리하세요.
+
+- 모든 질문과 그 답변(네/아니오 등)을 빠짐없이 "질문 -> 답변" 형식의 목록으로 남기세요.
+- 정답이 나왔다면 맨 위에 "정답: ..."으로 적으세요.
+- 중복된 질문은 하나로 합치세요.
+
+{previous}질문/답변 기록:
+{records}"""
+
+
+def _memory_text(value):
+    """LangMem 메모리 값({"content": ...})에서 텍스트 추출"""
+    content = value.get("content", value)
+    return content if isinstance(content, str) else str(content)
+
+
+def _age_minutes(items):
+    latest = max(item.updated_at for item in items)
+    if latest.tzinfo is None:
+        latest = latest.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - latest).total_seconds() / 60
+
+
+def summarize_game(llm, records, previous=None):
+    """질문/답변 기록(문자열 목록)을 요약 메모 하나로 합침"""
+    previous_text = f"이전에 정리한 메모:\n{previous}\n\n" if previous else ""
+    prompt = _SUMMARY_PROMPT.format(previous=previous_text, records="\n".join(f"- {r}" for r in records))
+    return llm.invoke(prompt).content
+
+
+def compact_game(store, llm, namespace, idle_minutes=30, min_items=2, max_items=40):
+    """
+    게임 namespace 하나를 압축하고 합친 항목 수를 반환 (조건에 맞지 않으면 0)
+    """
+    items = store.search(namespace, limit=_MAX_GAME_ITEMS)
+    # search()는 하위 namespace까지 돌려주므로 정확히 이 게임의 항목만 사용
+    items = [item for item in items if tuple(item.namespace) == tuple(namespace)]
+    summary = next((item for item in items if item.key == SUMMARY_KEY), None)
+    records = sorted((item for item in items if item.key != SUMMARY_KEY), key=lambda item: item.created_at)
+    if not records:
+        return 0
+
+    finished = _age_minutes(items) >= idle_minutes and len(records) >= min_items
+    if not finished and len(records) < max_items:
+        return 0
+
+    text = summarize_game(
+        llm,
+        [_memory_text(item.value) for item in records],
+        previous=_memory_text(summary.value) if summary else None,
+    )
+    # 요약을 먼저 저장하고 나서 원래 항목을 지움 (중간에 실패해도 기록이 사라지지 않도록)
+    store.put(namespace, SUMMARY_KEY, {"content": text})
+    for item in records:
+        store.delete(namespace, item.key)
+    return len(records)
+
+
+def compact_user(store, llm, user_id, **options):
+    """
+    사용자 한 명의 모든 게임을 압축
+
+    반환값: {"games": 압축한 게임 수, "items_before": ..., "items_after": ...}
+    """
+    namespaces = store.list_namespaces(prefix=(MEMORY_PREFIX, user_id), limit=_MAX_GAME_ITEMS)
+    report = {"games": 0, "items_before": 0, "items_after": 0}
+    for namespace in namespaces:
+        before = len(store.search(namespace, limit=_MAX_GAME_ITEMS))
+        if compact_game(store, llm, namespace, **options):
+            report["games"] += 1
+            after = len(store.search(namespace, limit=_MAX_GAME_ITEMS))
+        else:
+            after = before
+        report["items_before"] += before
+        report["items_after"] += after
+    return report
+
+
+def compact_all(sharded_store, store, llm, vacuum=True, **options):
+    """
+    모든 사용자의 메모리를 압축하고 사용자별로 줄어든 양을 반환
+
+    sharded_store: 사용자 목록과 디스크 사용량을 알려주는 ShardedStore
+    store: 실제로 읽고 쓸 저장소 (캐시를 거치도록 CachedStore를 넘김)
+    반환값: {사용자 id: {"games", "items_before", "items_after", "bytes_before", "bytes_after"}}
+    """
+    reports = {}
+    for user_id in sharded_store.tenants():
+        bytes_before = sharded_store.tenant_stats(user_id)["bytes"]
+        report = compact_user(store, llm, user_id, **options)
+        if not report["games"]:
+            continue
+        if vacuum:
+            sharded_store.vacuum(user_id)
+        report["bytes_before"] = bytes_before
+        report["bytes_after"] = sharded_store.tenant_stats(user_id)["bytes"]
+        reports[user_id] = report
+    return reports
+
+
+def format_report(reports):
+    """compact_all() 결과를 사람이 읽을 수 있는 한 줄 요약으로"""
+    before = sum(r["items_before"] for r in reports.values())
+    after = sum(r["items_after"] for r in reports.values())
+    bytes_before = sum(r["bytes_before"] for r in reports.values())
+    bytes_after = sum(r["bytes_after"] for r in reports.values())
+    games = sum(r["games"] for r in reports.values())
+    return (
+        f"🗜️ 메모리 압축: 사용자 {len(reports)}명, 게임 {games}개, "
+        f"항목 {before} -> {after}, 디스크 {bytes_before / 1024:.0f}KB -> {bytes_after / 1024:.0f}KB"
+    )
+
+
+def start_compactor(sharded_store, store, llm, interval_seconds=1800, on_compact=None, **options):
+    """백그라운드 스레드에서 주기적으로 compact_all() 실행 (on_compact(reports)는 압축한 게임이 있을 때 호출)"""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_seconds):
+            try:
+                reports = compact_all(sharded_store, store, llm, **options)
+                if reports:
+                    print(format_report(reports))
+                    if on_compact is not None:
+                        on_compact(reports)
+            except Exception as e:
+                print(f"메모리 압축 중 오류: {e}")
+
+    thread = threading.Thread(target=loop, name="memory-compactor", daemon=True)
+    thread.start()
+    return stop
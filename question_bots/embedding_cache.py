@@ -0,0 +1,139 @@
+"""
+LangMem 메모리 도구 앞에 두는 임베딩 캐시
+
+search_memory / manage_memory는 호출될 때마다 text-embedding-3-small로 텍스트를 임베딩하는데,
+시스템 프롬프트가 매 질문 전에 검색을 시키기 때문에 거의 같은 질의가 계속 다시 임베딩됨.
+정규화한 텍스트 + 모델 이름을 키로 해서
+1) 프로세스 안의 LRU 캐시 -> 2) SQLite 디스크 캐시 -> 3) 실제 임베딩 API 순서로 찾음.
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_MEMORY_ITEMS = 2048
+
+
+def normalize_text(text):
+    """유니코드 정규화 + 공백 정리 + 대소문자 통일 (의미가 같은 질의가 같은 키가 되도록)"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+class CachedEmbeddings(Embeddings):
+    """LRU 메모리 캐시 + SQLite 디스크 캐시를 가진 임베딩 래퍼"""
+
+    def __init__(self, embeddings, model_name, db_path=None, max_items=DEFAULT_MEMORY_ITEMS):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_items = max_items
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+
+    def _key(self, text):
+        payload = f"{self.model_name}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, keys):
+        """메모리 -> 디스크 순서로 찾아서 {key: vector} 반환"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        self.memory_hits += len(found)
+
+        remaining = [key for key in keys if key not in found]
+        if remaining and self._conn is not None:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({','.join('?' * len(remaining))})",
+                    remaining,
+                ).fetchall()
+            for key, blob in rows:
+                vector = array("f", blob).tolist()
+                found[key] = vector
+                self._remember(key, vector)
+            self.disk_hits += len(rows)
+        return found
+
+    def _store(self, items):
+        for key, vector in items:
+            self._remember(key, vector)
+        if self._conn is not None and items:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector) VALUES (?, ?)",
+                    [(key, array("f", vector).tobytes()) for key, vector in items],
+                )
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        # 같은 배치 안의 중복도 한 번만 조회/임베딩
+        unique_keys = list(dict.fromkeys(keys))
+        found = self._lookup(unique_keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            self.misses += len(missing)
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._store(new_items)
+            found.update(new_items)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self._store([(key, vector)])
+        return vector
+
+    async def aembed_documents(self, texts):
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text):
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def stats(self):
+        """캐시 계층별 적중 횟수와 전체 적중률"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_items": len(self._memory),
+        }
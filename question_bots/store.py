@@ -0,0 +1,346 @@
+"""
+SQLite 기반 영구 메모리 저장소 + 인메모리 핫 캐시
+
+InMemoryStore는 모든 메모리와 임베딩을 Streamlit 프로세스 힙에 들고 있어서
+재시작하면 사라지고 사용자가 늘수록 메모리 사용량(RSS)이 계속 커짐.
+여기서는 langgraph의 SqliteStore(sqlite-vec 벡터 인덱스)에 저장하고,
+자주 읽는 항목만 크기가 제한된 LRU 캐시에 올려서 프로세스 메모리가 일정하게 유지되도록 함.
+
+ShardedStore는 namespace의 사용자 id 칸을 기준으로 사용자마다 별도 SQLite 파일(샤드)에 저장해서
+검색 비용이 전체 사용량이 아니라 그 사용자의 데이터 양에만 비례하도록 함.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from langgraph.store.base import BaseStore, GetOp, ListNamespacesOp, PutOp, SearchOp
+from langgraph.store.sqlite import SqliteStore
+
+DEFAULT_CACHE_SIZE = 1000
+DEFAULT_MAX_OPEN_SHARDS = 128
+# namespace에 사용자 칸이 없는 항목이 들어가는 샤드
+SHARED_TENANT = "_shared"
+
+# 캐시에 "없음"도 저장해서 같은 키를 반복 조회할 때 DB를 다시 보지 않게 함
+_MISSING = object()
+
+
+def create_sqlite_connection(path):
+    """여러 스레드(Streamlit 세션)에서 같이 쓰는 autocommit + WAL 모드 SQLite 연결"""
+    conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # 항목을 지우면 store_vectors의 임베딩도 같이 지워지도록 (ON DELETE CASCADE)
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def create_sqlite_store(path, index=None, ttl=None):
+    """SQLite 파일에 연결된 SqliteStore 생성 (테이블/벡터 인덱스 마이그레이션까지 수행)"""
+    store = SqliteStore(create_sqlite_connection(path), index=index, ttl=ttl)
+    store.setup()
+    return store
+
+
+class CachedStore(BaseStore):
+    """
+    다른 저장소 앞에 LRU 캐시를 두는 저장소
+
+    get()만 캐시하고, put/delete가 들어오면 해당 키를 캐시에서 지움.
+    search()는 질의마다 결과가 달라서 항상 뒤쪽 저장소로 보냄.
+    """
+
+    def __init__(self, store, max_items=DEFAULT_CACHE_SIZE):
+        self.store = store
+        # put()/get()의 기본 TTL 처리는 바깥 저장소의 설정을 보므로 뒤쪽 저장소 설정을 그대로 노출
+        self.supports_ttl = getattr(store, "supports_ttl", False)
+        self.ttl_config = getattr(store, "ttl_config", None)
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key not in self._cache:
+                return None
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+
+    def _invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def batch(self, ops):
+        ops = list(ops)
+        results = [None] * len(ops)
+        pending = []
+        for i, op in enumerate(ops):
+            if isinstance(op, GetOp):
+                cached = self._cache_get((op.namespace, op.key))
+                if cached is not None:
+                    self.hits += 1
+                    results[i] = None if cached is _MISSING else cached
+                    continue
+                self.misses += 1
+            elif isinstance(op, PutOp):
+                # put과 delete(value=None) 모두 PutOp으로 들어옴
+                self._invalidate((op.namespace, op.key))
+            pending.append((i, op))
+
+        if pending:
+            backend_results = self.store.batch([op for _, op in pending])
+            for (i, op), result in zip(pending, backend_results):
+                results[i] = result
+                if isinstance(op, GetOp):
+                    self._cache_put((op.namespace, op.key), _MISSING if result is None else result)
+        return results
+
+    async def abatch(self, ops):
+        # SqliteStore는 동기 전용이라 스레드에서 실행
+        return await asyncio.to_thread(self.batch, ops)
+
+    def clear(self):
+        """캐시 비우기 (뒤쪽 저장소에서 항목이 만료/삭제되었을 때 호출)"""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """캐시 크기와 적중률"""
+        total = self.hits + self.misses
+        return {
+            "cached_items": len(self._cache),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class ShardedStore(BaseStore):
+    """
+    사용자(tenant)별로 SQLite 파일을 나눠 저장하는 저장소
+
+    namespace[tenant_position]을 사용자 id로 보고 shard_dir/<사용자 id>.db 에 저장함.
+    - ttl_minutes: 마지막으로 쓰거나 get()으로 읽은 뒤 이 시간이 지나면 항목 만료
+    - max_items_per_tenant: 사용자별 최대 항목 수, 넘으면 오래된 항목부터 삭제
+    - max_open_shards: 동시에 열어 두는 샤드 연결 수 (오래 안 쓴 사용자부터 닫음)
+    만료/개수 제한은 sweep()이나 start_sweeper()의 백그라운드 스레드에서 적용됨.
+    """
+
+    supports_ttl = True
+
+    def __init__(
+        self,
+        shard_dir,
+        index=None,
+        tenant_position=1,
+        ttl_minutes=None,
+        max_items_per_tenant=None,
+        max_open_shards=DEFAULT_MAX_OPEN_SHARDS,
+    ):
+        self.shard_dir = Path(shard_dir)
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.index = index
+        self.tenant_position = tenant_position
+        self.ttl_config = {"default_ttl": ttl_minutes, "refresh_on_read": True} if ttl_minutes else None
+        self.max_items_per_tenant = max_items_per_tenant
+        self.max_open_shards = max_open_shards
+        self._shards = OrderedDict()  # tenant -> SqliteStore (최근 사용 순)
+        self._in_use = defaultdict(int)
+        self._last_access = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+
+    def _tenant(self, namespace):
+        if len(namespace) > self.tenant_position:
+            return namespace[self.tenant_position]
+        return SHARED_TENANT
+
+    def _shard_path(self, tenant):
+        return self.shard_dir / f"{quote(tenant, safe='')}.db"
+
+    def tenants(self):
+        """디스크에 샤드가 있는 사용자 목록"""
+        return [unquote(path.stem) for path in self.shard_dir.glob("*.db")]
+
+    def _acquire(self, tenant):
+        """샤드를 열어서(또는 열린 것을 재사용해서) 반환, 사용이 끝나면 _release 호출"""
+        with self._lock:
+            shard = self._shards.get(tenant)
+            if shard is None:
+                shard = create_sqlite_store(self._shard_path(tenant), index=self.index, ttl=self.ttl_config)
+                self._shards[tenant] = shard
+            self._shards.move_to_end(tenant)
+            self._in_use[tenant] += 1
+            self._last_access[tenant] = time.time()
+            self._close_idle_shards()
+            return shard
+
+    def _release(self, tenant):
+        with self._lock:
+            self._in_use[tenant] -= 1
+
+    def _close_idle_shards(self):
+        # 사용 중이 아닌 샤드만 오래된 순서로 닫음 (self._lock 안에서 호출)
+        for tenant in list(self._shards):
+            if len(self._shards) <= self.max_open_shards:
+                break
+            if self._in_use[tenant] == 0:
+                self._shards.pop(tenant).conn.close()
+
+    def _run(self, tenant, ops):
+        # SqliteStore의 검색 + TTL 연장 쿼리는 CTE 안에 UPDATE를 넣어서 SQLite에서 실행되지 않음
+        # 검색은 만료 시각을 연장하지 않고, get()만 연장하도록 함
+        ops = [op._replace(refresh_ttl=False) if isinstance(op, SearchOp) else op for op in ops]
+        shard = self._acquire(tenant)
+        try:
+            return shard.batch(ops)
+        finally:
+            self._release(tenant)
+
+    def batch(self, ops):
+        ops = list(ops)
+        results = [None] * len(ops)
+        grouped = defaultdict(list)
+        for i, op in enumerate(ops):
+            if isinstance(op, ListNamespacesOp):
+                tenant = self._list_tenant(op)
+                if tenant is None:
+                    results[i] = self._list_namespaces_all(op)
+                else:
+                    grouped[tenant].append((i, op))
+            elif isinstance(op, SearchOp) and len(op.namespace_prefix) <= self.tenant_position:
+                # 사용자를 특정할 수 없는 검색은 (관리용) 모든 샤드를 뒤져서 합침
+                results[i] = self._search_all(op)
+            else:
+                namespace = op.namespace_prefix if isinstance(op, SearchOp) else op.namespace
+                grouped[self._tenant(namespace)].append((i, op))
+
+        for tenant, items in grouped.items():
+            shard_results = self._run(tenant, [op for _, op in items])
+            for (i, _), result in zip(items, shard_results):
+                results[i] = result
+        return results
+
+    async def abatch(self, ops):
+        return await asyncio.to_thread(self.batch, ops)
+
+    def _search_all(self, op):
+        limit = op.offset + op.limit
+        merged = []
+        for tenant in self.tenants():
+            merged.extend(self._run(tenant, [op._replace(offset=0, limit=limit)])[0])
+        merged.sort(key=lambda item: item.score if item.score is not None else float("-inf"), reverse=True)
+        return merged[op.offset:limit]
+
+    def _list_tenant(self, op):
+        """namespace 목록 조회가 특정 사용자 prefix로 제한되어 있으면 그 사용자 id"""
+        for condition in op.match_conditions or ():
+            if condition.match_type == "prefix" and len(condition.path) > self.tenant_position:
+                tenant = condition.path[self.tenant_position]
+                if tenant != "*":
+                    return tenant
+        return None
+
+    def _list_namespaces_all(self, op):
+        namespaces = set()
+        for tenant in self.tenants():
+            namespaces.update(self._run(tenant, [op._replace(offset=0, limit=op.offset + op.limit)])[0])
+        return sorted(namespaces)[op.offset:op.offset + op.limit]
+
+    def sweep(self):
+        """
+        모든 샤드에 TTL 만료와 사용자별 최대 항목 수를 적용
+
+        반환값: {사용자 id: 삭제한 항목 수} (삭제가 있었던 사용자만)
+        """
+        removed = {}
+        for tenant in self.tenants():
+            shard = self._acquire(tenant)
+            try:
+                count = shard.sweep_ttl() if self.ttl_config else 0
+                if self.max_items_per_tenant:
+                    with shard.lock:
+                        # updated_at은 초 단위라서 같은 초에 쓴 항목끼리는 rowid로 순서를 정함
+                        # (INSERT OR REPLACE로 다시 쓴 행은 새 rowid를 받으므로 rowid가 클수록 최근)
+                        cur = shard.conn.execute(
+                            """
+                            DELETE FROM store WHERE rowid IN (
+                                SELECT rowid FROM store ORDER BY updated_at DESC, rowid DESC LIMIT -1 OFFSET ?
+                            )
+                            """,
+                            (self.max_items_per_tenant,),
+                        )
+                        count += cur.rowcount
+            finally:
+                self._release(tenant)
+            if count:
+                removed[tenant] = count
+        return removed
+
+    def vacuum(self, tenant):
+        """삭제된 항목이 차지하던 디스크 공간을 샤드 파일에서 회수"""
+        shard = self._acquire(tenant)
+        try:
+            with shard.lock:
+                shard.conn.execute("VACUUM")
+                shard.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            self._release(tenant)
+
+    def start_sweeper(self, interval_seconds=600, on_sweep=None):
+        """백그라운드 스레드에서 주기적으로 sweep() 실행 (on_sweep(removed)은 삭제가 있을 때 호출)"""
+        if self._sweeper is not None:
+            return
+
+        def loop():
+            while not self._stop_sweeper.wait(interval_seconds):
+                try:
+                    removed = self.sweep()
+                    if removed and on_sweep is not None:
+                        on_sweep(removed)
+                except Exception as e:
+                    print(f"메모리 정리 중 오류: {e}")
+
+        self._sweeper = threading.Thread(target=loop, name="memory-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop_sweeper.set()
+
+    def tenant_stats(self, tenant):
+        """사용자 한 명의 메모리 사용량 (항목 수, 디스크 크기, 마지막 사용 시각)"""
+        path = self._shard_path(tenant)
+        if not path.exists():
+            return {"items": 0, "bytes": 0, "last_access": None}
+
+        shard = self._acquire(tenant)
+        try:
+            with shard.lock:
+                items = shard.conn.execute("SELECT COUNT(*) FROM store").fetchone()[0]
+        finally:
+            self._release(tenant)
+        size = sum(
+            os.path.getsize(f"{path}{suffix}")
+            for suffix in ("", "-wal", "-shm")
+            if os.path.exists(f"{path}{suffix}")
+        )
+        return {"items": items, "bytes": size, "last_access": self._last_access.get(tenant)}
+
+    def stats(self):
+        """전체 사용자별 메모리 사용량"""
+        return {tenant: self.tenant_stats(tenant) for tenant in self.tenants()}
@@ -0,0 +1,233 @@
+"""
+메모리 맵(mmap) 기반 IVF 근사 최근접 이웃(ANN) 인덱스
+
+청크가 수백만 개가 되면 sqlite-vec의 전수 검색(brute-force)은 느리고 메모리도 많이 먹음.
+IVF(Inverted File) 방식으로 벡터를 nlist개의 클러스터로 나누고,
+질문과 가까운 nprobe개 클러스터 안에서만 검색함.
+
+인덱스는 디렉터리 하나에 .npy 파일로 저장되고 np.load(mmap_mode="r")로 열기 때문에
+- 로딩 시 파일을 읽지 않아서 시작이 거의 즉시 끝나고
+- 여러 워커 프로세스가 같은 파일을 열면 OS 페이지 캐시를 공유해서 복사 없이(zero-copy) 같이 씀
+
+디렉터리 구조:
+    meta.json         dims, nlist, count
+    centroids.npy     (nlist, dims) float32 - 클러스터 중심
+    vectors.npy       (N, dims) float32 - 클러스터 순서로 정렬된 벡터
+    ids.npy           (N,) int64 - 각 벡터의 청크 id (VectorIndex의 rowid)
+    offsets.npy       (nlist + 1,) int64 - 클러스터 i의 벡터는 vectors[offsets[i]:offsets[i+1]]
+
+사용법:
+    python ann.py build --index rag_index.db --out rag_ann/ --nlist 1024
+"""
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_ANN_DIR = "rag_ann"
+DEFAULT_NPROBE = 8
+
+
+def _normalize(x):
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _assign(vectors, centroids, block_size=8192):
+    """각 벡터를 내적이 가장 큰 클러스터에 배정 (메모리를 아끼려고 블록 단위로 계산)"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        assignments[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors, nlist, iterations=20, sample_size=None, seed=0):
+    """
+    구면(spherical) k-means로 클러스터 중심 학습
+
+    정규화된 벡터를 쓰므로 내적(코사인)으로 배정하고 중심도 다시 정규화함.
+    데이터가 크면 sample_size개만 뽑아서 학습함 (기본: 클러스터당 256개)
+    벡터가 nlist개보다 적으면 클러스터 수를 벡터 수로 줄임 (반환되는 중심 수로 확인)
+    """
+    if len(vectors) == 0:
+        raise ValueError("벡터가 없어서 클러스터 중심을 학습할 수 없습니다")
+    if nlist < 1:
+        raise ValueError(f"클러스터 수는 1 이상이어야 합니다 (nlist={nlist})")
+    nlist = min(nlist, len(vectors))
+    rng = np.random.default_rng(seed)
+    # 샘플이 클러스터 수보다 적으면 초기 중심을 뽑을 수 없음
+    sample_size = max(sample_size or nlist * 256, nlist)
+    if len(vectors) > sample_size:
+        sample_idx = np.sort(rng.choice(len(vectors), sample_size, replace=False))
+        sample = np.asarray(vectors[sample_idx], dtype=np.float32)
+    else:
+        sample = np.asarray(vectors, dtype=np.float32)
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(assignments, minlength=nlist)
+        # 클러스터 순서로 정렬한 뒤 reduceat으로 클러스터별 합을 한 번에 계산 (np.add.at보다 훨씬 빠름)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        empty = counts == 0
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+        # 빈 클러스터는 임의의 샘플로 다시 시작
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """mmap으로 여는 IVF 인덱스 (읽기 전용, 여러 프로세스에서 공유 가능)"""
+
+    def __init__(self, path, nprobe=DEFAULT_NPROBE):
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text())
+        self.dims = meta["dims"]
+        self.nlist = meta["nlist"]
+        self.count = meta["count"]
+        self.nprobe = nprobe
+        # 중심과 오프셋은 작아서 메모리에 올리고, 벡터와 id는 mmap으로 필요한 부분만 읽음
+        self.centroids = np.load(self.path / "centroids.npy")
+        self.offsets = np.load(self.path / "offsets.npy")
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self.ids = np.load(self.path / "ids.npy", mmap_mode="r")
+
+    @classmethod
+    def build(cls, path, vectors, ids, nlist=None, iterations=20, sample_size=None, block_size=65536):
+        """
+        벡터 (N, dims)와 id (N,)로 인덱스를 만들어 path에 저장하고 연 인덱스를 반환
+
+        vectors는 정규화된 float32 배열(또는 mmap 배열)이어야 함.
+        nlist를 안 주면 sqrt(N)의 4배 정도로 정하고, 벡터 수(N)보다 크면 N으로 줄임.
+        벡터가 없으면 ValueError를 발생시킴 (기존 인덱스는 그대로 둠)
+        임시 디렉터리에 다 만든 뒤 교체하므로, 기존 인덱스를 mmap으로 열고 있던 프로세스는
+        계속 예전 파일을 읽고 새로 여는 프로세스부터 새 인덱스를 봄
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        count, dims = vectors.shape
+        if count == 0:
+            raise ValueError("벡터가 없어서 IVF 인덱스를 만들 수 없습니다")
+        if len(ids) != count:
+            raise ValueError(f"벡터 수({count})와 id 수({len(ids)})가 다릅니다")
+        if nlist is not None and nlist < 1:
+            raise ValueError(f"클러스터 수는 1 이상이어야 합니다 (nlist={nlist})")
+        nlist = min(nlist or int(4 * np.sqrt(count)), count)
+
+        final_path = Path(path)
+        path = final_path.parent / f".{final_path.name}.building"
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+
+        centroids = train_centroids(vectors, nlist, iterations=iterations, sample_size=sample_size)
+        assignments = _assign(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=offsets[1:])
+
+        # 정렬된 벡터를 블록 단위로 mmap 파일에 바로 써서 전체 복사본을 메모리에 두지 않음
+        sorted_vectors = np.lib.format.open_memmap(
+            path / "vectors.npy", mode="w+", dtype=np.float32, shape=(count, dims)
+        )
+        for start in range(0, count, block_size):
+            block_order = order[start:start + block_size]
+            sorted_vectors[start:start + len(block_order)] = vectors[block_order]
+        sorted_vectors.flush()
+        del sorted_vectors
+
+        np.save(path / "ids.npy", ids[order])
+        np.save(path / "centroids.npy", centroids)
+        np.save(path / "offsets.npy", offsets)
+        (path / "meta.json").write_text(json.dumps({"dims": int(dims), "nlist": int(nlist), "count": int(count)}))
+
+        old_path = final_path.parent / f".{final_path.name}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if final_path.exists():
+            final_path.rename(old_path)
+        path.rename(final_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return cls(final_path)
+
+    def search(self, query, k=5, nprobe=None):
+        """
+        질문 벡터와 가까운 k개의 (id, score) 목록
+
+        nprobe가 클수록 더 많은 클러스터를 뒤져서 recall은 올라가고 지연 시간도 늘어남
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        query = _normalize(np.asarray(query, dtype=np.float32))
+
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidate_ids = []
+        candidate_scores = []
+        for cluster in probes:
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if start == end:
+                continue
+            candidate_scores.append(self.vectors[start:end] @ query)
+            candidate_ids.append(self.ids[start:end])
+        if not candidate_scores:
+            return []
+
+        scores = np.concatenate(candidate_scores)
+        ids = np.concatenate(candidate_ids)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+def exact_search(vectors, ids, query, k=5, block_size=65536):
+    """전수 검색 (벤치마크 기준값)"""
+    query = _normalize(np.asarray(query, dtype=np.float32))
+    scores = np.concatenate([
+        np.asarray(vectors[start:start + block_size], dtype=np.float32) @ query
+        for start in range(0, len(vectors), block_size)
+    ])
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF ANN 인덱스")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="벡터 인덱스(SQLite)에서 IVF 인덱스 생성")
+    build_parser.add_argument("--index", default="rag_index.db", help="원본 벡터 인덱스(SQLite) 경로")
+    build_parser.add_argument("--out", default=DEFAULT_ANN_DIR, help="IVF 인덱스를 저장할 디렉터리")
+    build_parser.add_argument("--nlist", type=int, default=None, help="클러스터 수 (기본: 4 * sqrt(N))")
+    build_parser.add_argument("--dims", type=int, default=384, help="임베딩 차원")
+    args = parser.parse_args()
+    if args.nlist is not None and args.nlist < 1:
+        parser.error("--nlist는 1 이상이어야 합니다")
+
+    from index import VectorIndex
+
+    index = VectorIndex(args.index, dims=args.dims)
+    started = time.perf_counter()
+    # SQLite에서 꺼낸 벡터도 임시 mmap 파일에 써서 전체를 메모리에 올리지 않음
+    raw_path = Path(f"{args.out}.raw.npy")
+    ids, vectors = index.export_vectors(raw_path)
+    try:
+        if not len(ids):
+            parser.error(f"{args.index}에 임베딩이 없습니다 (먼저 python pipline.py ... --index {args.index} 로 색인하세요)")
+        ann = IVFIndex.build(args.out, vectors, ids, nlist=args.nlist)
+    finally:
+        del vectors
+        raw_path.unlink(missing_ok=True)
+    print(f"✅ 벡터 {ann.count}개, 클러스터 {ann.nlist}개 -> {args.out} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+IVF ANN 인덱스 recall@k 벤치마크 (전수 검색 대비)
+
+nprobe 값을 바꿔가며 전수 검색 결과와 겹치는 비율(recall@k)과 질의 지연 시간을 측정함.
+
+사용법:
+    python bench_ann.py                                  # 합성 데이터 (기본 20만 개, 384차원)
+    python bench_ann.py --count 1000000 --nlist 4096     # 더 큰 합성 데이터
+    python bench_ann.py --index rag_index.db             # 실제 벡터 인덱스의 임베딩으로 측정
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ann import IVFIndex, exact_search
+
+
+def synthetic_vectors(count, dims, clusters=256, seed=0):
+    """클러스터 구조가 있는 정규화된 합성 임베딩 (실제 문서 임베딩처럼 주제별로 뭉쳐 있음)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((count, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF recall@k 벤치마크")
+    parser.add_argument("--index", default=None, help="실제 벡터 인덱스(SQLite) 경로 (없으면 합성 데이터)")
+    parser.add_argument("--count", type=int, default=200_000, help="합성 벡터 수")
+    parser.add_argument("--dims", type=int, default=384, help="임베딩 차원")
+    parser.add_argument("--nlist", type=int, default=None, help="클러스터 수 (기본: 4 * sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64], help="측정할 nprobe 값")
+    parser.add_argument("-k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--queries", type=int, default=200, help="질의 수")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.index:
+            from index import VectorIndex
+
+            ids, vectors = VectorIndex(args.index, dims=args.dims).export_vectors(Path(tmp) / "raw.npy")
+        else:
+            vectors = synthetic_vectors(args.count, args.dims)
+            ids = np.arange(len(vectors), dtype=np.int64)
+
+        started = time.perf_counter()
+        ann = IVFIndex.build(Path(tmp) / "ivf", vectors, ids, nlist=args.nlist)
+        build_s = time.perf_counter() - started
+
+        # 새 프로세스가 인덱스를 여는 비용 (mmap이라 파일 크기와 거의 무관)
+        started = time.perf_counter()
+        ann = IVFIndex(Path(tmp) / "ivf")
+        open_ms = (time.perf_counter() - started) * 1000
+
+        # 질의는 데이터에서 뽑은 벡터에 약간의 노이즈를 섞어서 사용
+        rng = np.random.default_rng(1)
+        queries = np.asarray(vectors[rng.choice(len(vectors), args.queries, replace=False)], dtype=np.float32)
+        queries += 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+        exact_results = []
+        exact_latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            exact_results.append({i for i, _ in exact_search(vectors, ids, query, k=args.k)})
+            exact_latencies.append(time.perf_counter() - started)
+
+        print(f"벡터 {ann.count}개, {ann.dims}차원, 클러스터 {ann.nlist}개")
+        print(f"빌드 {build_s:.1f}s, 인덱스 열기 {open_ms:.2f}ms")
+        print(f"전수 검색: p50 {percentile_ms(exact_latencies, 50):.2f}ms, p99 {percentile_ms(exact_latencies, 99):.2f}ms")
+        print()
+        print(f"{'nprobe':>6} | {'recall@' + str(args.k):>9} | {'p50 ms':>7} | {'p99 ms':>7}")
+        print("-" * 40)
+        for nprobe in args.nprobe:
+            recalls = []
+            latencies = []
+            for query, expected in zip(queries, exact_results):
+                started = time.perf_counter()
+                found = {i for i, _ in ann.search(query, k=args.k, nprobe=nprobe)}
+                latencies.append(time.perf_counter() - started)
+                recalls.append(len(found & expected) / len(expected))
+            print(
+                f"{nprobe:>6} | {np.mean(recalls):>9.3f} | "
+                f"{percentile_ms(latencies, 50):>7.2f} | {percentile_ms(latencies, 99):>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+변환 프로필별 처리량(pages/sec) 측정
+
+모델 로딩 시간은 빼고(initialize_pipeline으로 미리 로딩) 순수 변환 시간만 잼.
+문서 종류(논문, 스캔본, 표가 많은 보고서 등)별로 돌려서 프로필을 고르는 근거로 사용함.
+
+사용법:
+    python bench_profiles.py                                   # data/transformer.pdf, 모든 프로필
+    python bench_profiles.py data/ --profiles full fast        # 디렉터리 안의 PDF, 프로필 지정
+    python bench_profiles.py data/ --json profile_bench.json   # 결과를 JSON으로도 저장
+"""
+import argparse
+import json
+import time
+
+from docling.datamodel.base_models import InputFormat
+
+from pipline import SOURCE, collect_sources
+from profiles import PROFILES, create_converter, has_text_layer
+
+
+def bench_profile(profile, sources, repeat=1):
+    """프로필 하나로 모든 소스를 변환하고 (페이지 수, 변환 시간)을 반환"""
+    converter = create_converter(profile)
+    converter.initialize_pipeline(InputFormat.PDF)
+
+    pages = 0
+    elapsed = 0.0
+    for _ in range(repeat):
+        for source in sources:
+            started = time.perf_counter()
+            result = converter.convert(source)
+            elapsed += time.perf_counter() - started
+            pages += len(result.document.pages)
+    return pages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="변환 프로필 처리량 측정")
+    parser.add_argument("inputs", nargs="*", help="측정할 파일 또는 디렉터리 (없으면 data/transformer.pdf)")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=1, help="반복 횟수")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    sources = collect_sources(args.inputs or [SOURCE])
+    # fast/text 프로필은 텍스트 레이어가 있는 문서에만 적용되므로 같은 조건에서 비교하도록 나눠서 보여줌
+    scanned = [s for s in sources if not has_text_layer(s)]
+    print(f"📄 문서 {len(sources)}개 (텍스트 레이어 없음 {len(scanned)}개)")
+    if scanned:
+        print("⚠️ 스캔 문서는 fast/text 프로필에서도 OCR이 필요해서 실제 파이프라인에서는 full로 처리됩니다")
+    print()
+
+    results = {}
+    print(f"{'profile':>8} | {'pages':>6} | {'seconds':>8} | {'pages/sec':>9}")
+    print("-" * 42)
+    for profile in args.profiles:
+        pages, elapsed = bench_profile(profile, sources, args.repeat)
+        pages_per_sec = pages / elapsed if elapsed else 0.0
+        results[profile] = {"pages": pages, "seconds": round(elapsed, 3), "pages_per_sec": round(pages_per_sec, 3)}
+        print(f"{profile:>8} | {pages:>6} | {elapsed:>8.2f} | {pages_per_sec:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sources": [str(s) for s in sources], "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Docling 변환 결과 캐시
+
+파일 내용 해시 + 변환 옵션 해시를 키로 해서 DoclingDocument(JSON)와 마크다운을 디스크에 저장함.
+같은 파일을 같은 옵션으로 다시 변환하면 레이아웃/OCR 변환을 건너뛰고 캐시에서 바로 읽어옴.
+
+캐시 구조:
+    .docling_cache/
+        <키 앞 2글자>/<키>/document.json
+                          /document.md
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from docling_core.types.doc import DoclingDocument
+
+DEFAULT_CACHE_DIR = ".docling_cache"
+
+# 결과에 영향을 주지 않는 옵션은 키에서 제외 (스레드 수, 모델 경로 등)
+_IGNORED_OPTIONS = {"accelerator_options", "artifacts_path"}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """파일 내용의 sha256 해시 (큰 파일도 조금씩 읽어서 계산)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_fingerprint(pipeline_options=None, extra=None):
+    """
+    변환 옵션 + docling 버전을 짧은 해시로 변환 (옵션이나 버전이 바뀌면 캐시가 무효화됨)
+
+    extra에는 백엔드, 페이지 범위처럼 파이프라인 옵션 밖에서 결과에 영향을 주는 값을 넣음
+    """
+    try:
+        docling_version = version("docling")
+    except PackageNotFoundError:
+        docling_version = "unknown"
+
+    options = {}
+    if pipeline_options is not None:
+        options = pipeline_options.model_dump(mode="json", exclude=_IGNORED_OPTIONS)
+
+    payload = json.dumps(
+        {"docling": docling_version, "options": options, "extra": extra or {}}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ConversionCache:
+    """내용 주소 기반(content-addressed) 변환 결과 캐시"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source, options_key, content_hash=None):
+        """캐시 키 = 파일 내용 해시 + 옵션 해시"""
+        content_hash = content_hash or file_sha256(source)
+        return f"{content_hash}-{options_key}"
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def markdown_path(self, key):
+        """캐시 히트면 마크다운 파일 경로, 아니면 None"""
+        path = self._entry_dir(key) / "document.md"
+        if path.exists():
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def load_document(self, key):
+        """캐시된 DoclingDocument 로딩 (없으면 None)"""
+        path = self._entry_dir(key) / "document.json"
+        if not path.exists():
+            return None
+        return DoclingDocument.load_from_json(path)
+
+    def put(self, key, document):
+        """
+        변환 결과를 캐시에 저장하고 마크다운 경로를 반환
+
+        임시 디렉터리에 먼저 쓰고 rename 하므로 여러 프로세스가 동시에 써도 반쯤 쓰인 항목이 보이지 않음
+        """
+        entry_dir = self._entry_dir(key)
+        if (entry_dir / "document.md").exists():
+            return entry_dir / "document.md"
+
+        entry_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=entry_dir.parent, prefix=".tmp-"))
+        try:
+            document.save_as_json(tmp_dir / "document.json")
+            document.save_as_markdown(tmp_dir / "document.md")
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # 다른 프로세스가 먼저 같은 키를 저장한 경우
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not (entry_dir / "document.md").exists():
+                raise
+        return entry_dir / "document.md"
@@ -0,0 +1,66 @@
+"""
+DoclingDocument를 제목(heading) 구조를 따라 청크로 분할
+
+HierarchicalChunker는 문서 구조(섹션, 리스트, 표 등)를 따라 자르고
+각 청크에 상위 제목 목록을 메타데이터로 붙여줌.
+임베딩할 텍스트는 "제목 > 하위 제목\\n본문" 형태로 만들어서 검색 시 문맥이 살아있도록 함.
+"""
+from docling_core.transforms.chunker import HierarchicalChunker
+
+# 너무 짧은 청크(단독 제목, 페이지 번호 등)는 같은 섹션의 다음 청크에 합침
+MIN_CHUNK_CHARS = 200
+MAX_CHUNK_CHARS = 2000
+
+_chunker = HierarchicalChunker()
+
+
+def _page_no(chunk):
+    for item in chunk.meta.doc_items:
+        if item.prov:
+            return item.prov[0].page_no
+    return None
+
+
+def chunk_document(document, source, min_chars=MIN_CHUNK_CHARS, max_chars=MAX_CHUNK_CHARS):
+    """
+    문서를 청크 dict 목록으로 변환
+
+    반환값: [{"source", "page_no", "headings", "text"}, ...]
+    """
+    chunks = []
+    pending = None
+    for chunk in _chunker.chunk(document):
+        headings = list(chunk.meta.headings or [])
+        text = chunk.text.strip()
+        if not text:
+            continue
+
+        # 같은 섹션의 짧은 청크는 최대 길이를 넘지 않는 선에서 이어 붙임
+        if (
+            pending is not None
+            and pending["headings"] == headings
+            and len(pending["text"]) < min_chars
+            and len(pending["text"]) + len(text) <= max_chars
+        ):
+            pending["text"] += "\n" + text
+            continue
+
+        if pending is not None:
+            chunks.append(pending)
+        pending = {
+            "source": str(source),
+            "page_no": _page_no(chunk),
+            "headings": headings,
+            "text": text,
+        }
+
+    if pending is not None:
+        chunks.append(pending)
+    return chunks
+
+
+def embedding_text(chunk):
+    """임베딩에 사용할 텍스트 (제목 경로 + 본문)"""
+    if chunk["headings"]:
+        return " > ".join(chunk["headings"]) + "\n" + chunk["text"]
+    return chunk["text"]
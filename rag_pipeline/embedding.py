@@ -0,0 +1,55 @@
+"""
+로컬 임베딩 모델 (외부 API 없이 transformers로 직접 임베딩)
+
+sentence-transformers/all-MiniLM-L6-v2 (384차원)를 mean pooling + L2 정규화해서 사용함.
+정규화된 벡터라서 내적 = 코사인 유사도이고, L2 거리 순서와 코사인 순서가 같음.
+"""
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_BATCH_SIZE = 32
+
+
+class LocalEmbedder:
+    """배치 단위로 텍스트를 임베딩하는 로컬 모델"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, batch_size=DEFAULT_BATCH_SIZE, max_length=256):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+        self.dims = self.model.config.hidden_size
+
+    @torch.inference_mode()
+    def _embed_batch(self, texts):
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt",
+        )
+        output = self.model(**encoded).last_hidden_state
+        # 패딩 토큰을 제외한 mean pooling
+        mask = encoded["attention_mask"].unsqueeze(-1).to(output.dtype)
+        pooled = (output * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        return pooled.cpu().numpy().astype(np.float32)
+
+    def embed(self, texts):
+        """텍스트 목록 -> (N, dims) float32 배열"""
+        if not texts:
+            return np.zeros((0, self.dims), dtype=np.float32)
+        batches = [
+            self._embed_batch(texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches)
+
+    def embed_query(self, text):
+        """질문 하나 -> (dims,) float32 벡터"""
+        return self._embed_batch([text])[0]
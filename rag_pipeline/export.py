@@ -0,0 +1,80 @@
+"""
+페이지 단위 스트리밍 마크다운 내보내기
+
+export_to_markdown()은 문서 전체를 하나의 문자열로 만들기 때문에
+수백 페이지짜리 문서는 문서 트리 + 거대한 문자열이 동시에 메모리에 올라감.
+여기서는 PDF를 window 페이지씩 끊어서 변환하고, 페이지마다 마크다운을 yield 해서
+문서 길이와 상관없이 메모리 사용량이 일정하게 유지되도록 함.
+"""
+import sys
+
+import pypdfium2
+
+DEFAULT_WINDOW = 10
+
+
+def pdf_page_count(source):
+    """PDF 페이지 수 (텍스트/레이아웃은 읽지 않고 페이지 수만 확인)"""
+    pdf = pypdfium2.PdfDocument(str(source))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def iter_document_markdown(document):
+    """이미 변환된 DoclingDocument를 페이지별 (page_no, markdown)으로 yield"""
+    for page_no in sorted(document.pages):
+        yield page_no, document.export_to_markdown(page_no=page_no)
+
+
+def iter_document_windows(converter, source, window=DEFAULT_WINDOW, page_range=None):
+    """PDF를 window 페이지씩 변환하면서 부분 DoclingDocument를 하나씩 yield (page_range 안에서만)"""
+    first, last = page_range or (1, None)
+    total = pdf_page_count(source)
+    last = min(last or total, total)
+    for start in range(first, last + 1, window):
+        end = min(start + window - 1, last)
+        yield converter.convert(source, page_range=(start, end)).document
+
+
+def iter_page_markdown(converter, source, window=DEFAULT_WINDOW, on_window=None, page_range=None):
+    """
+    PDF를 window 페이지씩 변환하면서 페이지별 (page_no, markdown)을 yield
+
+    한 번에 window 페이지 분량의 문서 트리만 메모리에 있고,
+    소비자는 첫 window가 끝나자마자 청킹 등 다음 단계를 시작할 수 있음.
+    on_window를 주면 각 부분 문서를 해제하기 전에 on_window(document)를 호출함.
+    """
+    for document in iter_document_windows(converter, source, window, page_range):
+        if on_window is not None:
+            on_window(document)
+        yield from iter_document_markdown(document)
+        # 다음 window로 넘어가기 전에 문서 트리를 해제
+        del document
+
+
+def write_markdown_stream(pages, output=None):
+    """
+    (page_no, markdown) 이터러블을 파일이나 stdout에 페이지마다 바로 씀
+
+    output이 None이면 stdout, 문자열/경로면 해당 파일에 씀. 쓴 페이지 수를 반환.
+    """
+    if output is None:
+        return _write_pages(pages, sys.stdout)
+
+    with open(output, "w", encoding="utf-8") as f:
+        return _write_pages(pages, f)
+
+
+def _write_pages(pages, f):
+    count = 0
+    for _, markdown in pages:
+        if count:
+            f.write("\n\n")
+        f.write(markdown)
+        f.flush()
+        count += 1
+    if count:
+        f.write("\n")
+    return count
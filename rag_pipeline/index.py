@@ -0,0 +1,152 @@
+"""
+sqlite-vec 기반 로컬 벡터 인덱스
+
+청크 텍스트/메타데이터는 일반 테이블에, 임베딩은 vec0 가상 테이블에 같은 rowid로 저장함.
+파일 하나(SQLite DB)로 끝나고 외부 서비스 없이 밀리초 단위로 검색 가능.
+"""
+import json
+import sqlite3
+
+import numpy as np
+import sqlite_vec
+
+DEFAULT_INDEX_PATH = "rag_index.db"
+
+
+class VectorIndex:
+    """청크 + 임베딩을 저장하고 k-NN 검색을 하는 SQLite 인덱스"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, dims=384):
+        self.path = str(path)
+        self.dims = dims
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.enable_load_extension(True)
+        sqlite_vec.load(self.conn)
+        self.conn.enable_load_extension(False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.setup()
+
+    def setup(self):
+        """테이블 생성 (이미 있으면 그대로 사용)"""
+        self.conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                page_no INTEGER,
+                headings TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunk_vectors USING vec0(
+                embedding float[{self.dims}]
+            );
+            """
+        )
+
+    def add(self, chunks, embeddings):
+        """청크 목록과 (N, dims) 임베딩을 한 트랜잭션으로 저장"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(chunks) != len(embeddings):
+            raise ValueError(f"청크 수({len(chunks)})와 임베딩 수({len(embeddings)})가 다릅니다")
+
+        with self.conn:
+            for chunk, embedding in zip(chunks, embeddings):
+                cur = self.conn.execute(
+                    "INSERT INTO chunks (source, page_no, headings, text) VALUES (?, ?, ?, ?)",
+                    (
+                        chunk["source"],
+                        chunk["page_no"],
+                        json.dumps(chunk["headings"], ensure_ascii=False),
+                        chunk["text"],
+                    ),
+                )
+                self.conn.execute(
+                    "INSERT INTO chunk_vectors (rowid, embedding) VALUES (?, ?)",
+                    (cur.lastrowid, embedding.tobytes()),
+                )
+
+    def delete_source(self, source):
+        """특정 파일에서 나온 청크를 모두 삭제하고 삭제한 개수를 반환"""
+        with self.conn:
+            ids = [row[0] for row in self.conn.execute("SELECT id FROM chunks WHERE source = ?", (str(source),))]
+            self.conn.executemany("DELETE FROM chunk_vectors WHERE rowid = ?", [(i,) for i in ids])
+            self.conn.execute("DELETE FROM chunks WHERE source = ?", (str(source),))
+        return len(ids)
+
+    def search(self, query_embedding, k=5):
+        """
+        질문 임베딩과 가장 가까운 청크 k개를 반환
+
+        벡터가 L2 정규화되어 있으므로 L2 거리 d에서 코사인 유사도 = 1 - d^2 / 2
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        rows = self.conn.execute(
+            """
+            SELECT c.id, c.source, c.page_no, c.headings, c.text, v.distance
+            FROM (
+                SELECT rowid, distance FROM chunk_vectors
+                WHERE embedding MATCH ? AND k = ?
+            ) v
+            JOIN chunks c ON c.id = v.rowid
+            ORDER BY v.distance
+            """,
+            (query.tobytes(), k),
+        ).fetchall()
+        return [
+            {
+                "id": chunk_id,
+                "source": source,
+                "page_no": page_no,
+                "headings": json.loads(headings),
+                "text": text,
+                "score": 1.0 - distance * distance / 2,
+            }
+            for chunk_id, source, page_no, headings, text, distance in rows
+        ]
+
+    def get_chunks(self, ids):
+        """id 목록에 해당하는 청크를 id 순서 그대로 반환 (ANN 검색 결과를 텍스트로 바꿀 때 사용)"""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        rows = self.conn.execute(
+            f"SELECT id, source, page_no, headings, text FROM chunks WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        ).fetchall()
+        by_id = {
+            chunk_id: {
+                "id": chunk_id,
+                "source": source,
+                "page_no": page_no,
+                "headings": json.loads(headings),
+                "text": text,
+            }
+            for chunk_id, source, page_no, headings, text in rows
+        }
+        return [by_id[i] for i in ids if i in by_id]
+
+    def export_vectors(self, out_path, batch_size=10000):
+        """
+        모든 임베딩을 (ids, vectors)로 내보냄
+
+        vectors는 out_path에 만든 mmap 배열이라 청크가 아주 많아도 메모리에 한꺼번에 올라가지 않음
+        """
+        count = self.conn.execute("SELECT COUNT(*) FROM chunk_vectors").fetchone()[0]
+        ids = np.empty(count, dtype=np.int64)
+        vectors = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float32, shape=(count, self.dims))
+        cur = self.conn.execute("SELECT rowid, embedding FROM chunk_vectors ORDER BY rowid")
+        pos = 0
+        while rows := cur.fetchmany(batch_size):
+            for rowid, embedding in rows:
+                ids[pos] = rowid
+                vectors[pos] = np.frombuffer(embedding, dtype=np.float32)
+                pos += 1
+        vectors.flush()
+        return ids[:pos], vectors[:pos]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,79 @@
+"""
+증분 재처리(incremental re-ingestion)를 위한 소스 파일 매니페스트
+
+처리한 파일마다 mtime, size, sha256, 출력 경로를 JSON으로 기록해 두고
+다음 실행 때 새로 생기거나 바뀐 파일 / 삭제된 파일 / 그대로인 파일을 구분함.
+mtime과 size가 같으면 해시를 다시 계산하지 않아서 바뀌지 않은 파일은 stat 한 번으로 끝남.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from cache import file_sha256
+
+DEFAULT_MANIFEST_PATH = "rag_manifest.json"
+
+
+class Manifest:
+    """소스 파일 상태 기록 (source 경로 -> {mtime, size, sha256, output})"""
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def diff(self, sources):
+        """
+        현재 소스 목록과 매니페스트를 비교
+
+        반환값: (changed, unchanged, deleted)
+        - changed: 새로 생겼거나 내용이 바뀐 파일 [(path, sha256), ...]
+        - unchanged: 그대로인 파일 [path, ...]
+        - deleted: 매니페스트에는 있는데 디스크에서 사라진 source 문자열 목록
+        """
+        changed = []
+        unchanged = []
+        for source in sources:
+            key = str(source)
+            stat = os.stat(source)
+            entry = self.entries.get(key)
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                unchanged.append(source)
+                continue
+
+            sha256 = file_sha256(source)
+            if entry and entry["sha256"] == sha256:
+                # touch만 되고 내용은 같은 경우 - 다음부터 해시를 건너뛰도록 stat만 갱신
+                entry["mtime"] = stat.st_mtime
+                entry["size"] = stat.st_size
+                unchanged.append(source)
+            else:
+                changed.append((source, sha256))
+
+        # 다른 디렉터리만 돌린 경우에도 잘못 지우지 않도록, 실제로 파일이 없어진 것만 삭제로 봄
+        deleted = [key for key in self.entries if not Path(key).exists()]
+        return changed, unchanged, deleted
+
+    def record(self, source, sha256, output=None):
+        """처리가 끝난 파일을 기록"""
+        stat = os.stat(source)
+        self.entries[str(source)] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": sha256,
+            "output": str(output) if output else None,
+        }
+
+    def remove(self, source):
+        """삭제된 파일의 기록을 지우고 그 기록을 반환"""
+        return self.entries.pop(str(source), None)
+
+    def save(self):
+        """임시 파일에 쓰고 교체해서 중간에 죽어도 매니페스트가 깨지지 않게 함"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".manifest-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
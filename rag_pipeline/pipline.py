@@ -3,10 +3,343 @@ load_dotenv()
 
 """
 Docling은 convert() 메서드를 통해 문서 변환 기능을 제공함
+
+사용법:
+    python pipline.py                               # data/transformer.pdf 하나를 변환해서 출력
+    python pipline.py data/ --output-dir out/       # 디렉터리 안의 PDF를 병렬로 일괄 변환
+    python pipline.py a.pdf b.pdf -o out/ -w 4      # 파일 목록을 워커 4개로 변환
+    python pipline.py data/ -o out/ --no-cache      # 캐시를 무시하고 전부 다시 변환
+    python pipline.py big.pdf -o out/ --stream      # 10페이지씩 변환하며 페이지 단위로 바로 기록
+    python pipline.py data/ -o out/ --index rag_index.db   # 변환 후 청킹 + 임베딩해서 벡터 인덱스에 저장
+    python pipline.py data/ -o out/ --index rag_index.db --incremental   # 바뀐 파일만 처리, 삭제된 파일은 인덱스에서 제거
+    python pipline.py data/ -o out/ --profile fast  # 텍스트 레이어가 있으면 OCR/표 모델 생략 (profiles.py 참고)
+    python pipline.py --preview 3                   # 앞 3페이지만 변환 (--pages 5-10 으로 범위 지정도 가능)
 """
-from docling.document_converter import DocumentConverter
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from docling.datamodel.base_models import InputFormat
+
+from cache import DEFAULT_CACHE_DIR, ConversionCache
+from chunking import chunk_document, embedding_text
+from export import DEFAULT_WINDOW, iter_page_markdown, write_markdown_stream
+from manifest import DEFAULT_MANIFEST_PATH, Manifest
+from profiles import (
+    DEFAULT_PROFILE,
+    PROFILES,
+    convert_kwargs,
+    create_converter,
+    parse_page_range,
+    profile_fingerprint,
+    resolve_profile,
+)
+
+SOURCE = "data/transformer.pdf"
+SUPPORTED_SUFFIXES = {".pdf"}
+
+# 워커 프로세스마다 한 번만 만들어서 계속 재사용하는 변환기 (모델 로딩 비용을 한 번만 냄)
+# fast 프로필이어도 스캔 문서는 full로 바뀌므로 프로필별로 하나씩 둠
+_converters = {}
+_num_threads = None
+_cache = None
+
+
+def collect_sources(inputs):
+    """파일/디렉터리 목록을 받아서 변환할 파일 경로 목록으로 펼침"""
+    sources = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            sources.extend(
+                sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES)
+            )
+        elif path.is_file():
+            sources.append(path)
+        else:
+            print(f"⚠️ 파일을 찾을 수 없어 건너뜁니다: {item}")
+    return sources
+
+
+def _output_paths(sources, output_dir):
+    """소스마다 겹치지 않는 출력 파일 경로(.md)를 정함"""
+    output_dir = Path(output_dir)
+    used = set()
+    paths = {}
+    for source in sources:
+        name = source.stem
+        candidate = name
+        n = 1
+        while candidate in used:
+            n += 1
+            candidate = f"{name}_{n}"
+        used.add(candidate)
+        paths[source] = output_dir / f"{candidate}.md"
+    return paths
+
+
+def convert_cached(converter, source, cache=None, options_key=None, page_range=None):
+    """
+    캐시를 먼저 확인하고, 없을 때만 변환해서 캐시에 저장
+
+    반환값: (DoclingDocument, 마크다운 경로 또는 None)
+    """
+    if cache is None:
+        return converter.convert(source, **convert_kwargs(page_range)).document, None
+
+    key = cache.key(source, options_key)
+    markdown_path = cache.markdown_path(key)
+    if markdown_path is not None:
+        return cache.load_document(key), markdown_path
+
+    document = converter.convert(source, **convert_kwargs(page_range)).document
+    return document, cache.put(key, document)
+
+
+def index_chunks(index, embedder, chunks, replace_source=None):
+    """
+    청크를 배치로 임베딩해서 벡터 인덱스에 저장 (변환 다음 단계)
+
+    replace_source를 주면 그 파일에서 나온 기존 청크를 먼저 지워서 재색인 시 중복이 생기지 않게 함
+    """
+    if replace_source is not None:
+        index.delete_source(replace_source)
+    if not chunks:
+        return 0
+    embeddings = embedder.embed([embedding_text(chunk) for chunk in chunks])
+    index.add(chunks, embeddings)
+    return len(chunks)
+
+
+def _get_converter(profile):
+    """워커 안에서 프로필별 변환기를 처음 필요할 때 만들어서 재사용"""
+    if profile not in _converters:
+        converter = create_converter(profile, _num_threads)
+        converter.initialize_pipeline(InputFormat.PDF)
+        _converters[profile] = converter
+    return _converters[profile]
+
+
+def _init_worker(num_threads, cache_dir, profile):
+    """워커 프로세스 초기화 - 변환기를 만들고 PDF 파이프라인 모델을 미리 로딩"""
+    global _num_threads, _cache
+    _num_threads = num_threads
+    _get_converter(profile)
+    _cache = ConversionCache(cache_dir) if cache_dir else None
+
+
+def _convert_one(source, output_path, cache_key, profile, page_range=None, stream_window=None, with_chunks=False):
+    """워커에서 파일 하나를 변환해서 바로 디스크에 씀 (with_chunks면 청킹까지 워커에서 처리)"""
+    started = time.perf_counter()
+    chunks = [] if with_chunks else None
+    try:
+        converter = _get_converter(profile)
+        if stream_window:
+            # 스트리밍 모드는 문서 전체를 만들지 않으므로 캐시에 저장하지 않고, 청킹도 window 단위로 함
+            on_window = (lambda document: chunks.extend(chunk_document(document, source))) if with_chunks else None
+            pages = iter_page_markdown(converter, source, stream_window, on_window, page_range)
+            write_markdown_stream(pages, output_path)
+            return str(source), str(output_path), time.perf_counter() - started, None, chunks
+
+        document = converter.convert(source, **convert_kwargs(page_range)).document
+        if _cache is not None:
+            shutil.copyfile(_cache.put(cache_key, document), output_path)
+        else:
+            document.save_as_markdown(output_path)
+        if with_chunks:
+            chunks = chunk_document(document, source)
+        return str(source), str(output_path), time.perf_counter() - started, None, chunks
+    except Exception as e:
+        return str(source), None, time.perf_counter() - started, str(e), None
+
+
+def convert_batch(sources, output_dir, max_workers=None, cache_dir=DEFAULT_CACHE_DIR, stream_window=None,
+                  with_chunks=False, output_paths=None, content_hashes=None, profile=DEFAULT_PROFILE,
+                  page_range=None):
+    """
+    여러 파일을 프로세스 풀에서 병렬로 변환
+
+    캐시에 있는 파일은 워커를 띄우지 않고 바로 복사하고, 나머지만 프로세스 풀로 보냄.
+    stream_window를 주면 워커가 해당 페이지 수만큼씩 끊어서 변환하며 페이지 단위로 기록함.
+    워커마다 DocumentConverter를 하나씩 띄워 두고 재사용하며,
+    파일 하나가 끝날 때마다 결과를 output_dir에 쓰고 (source, output, elapsed, error, chunks)를 yield 함.
+    chunks는 with_chunks가 True일 때만 채워짐.
+    output_paths / content_hashes를 주면 미리 정한 출력 경로와 이미 계산한 파일 해시를 그대로 사용함.
+    profile / page_range는 profiles.py의 변환 프로필과 페이지 범위
+    """
+    sources = list(sources)
+    if not sources:
+        return
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    output_paths = output_paths or _output_paths(sources, output_dir)
+    content_hashes = content_hashes or {}
+
+    # 캐시 히트는 변환 없이 바로 처리
+    cache = ConversionCache(cache_dir) if cache_dir else None
+    pending = []
+    for source in sources:
+        source_profile = resolve_profile(profile, source)
+        if cache is None:
+            pending.append((source, None, source_profile))
+            continue
+        started = time.perf_counter()
+        options_key = profile_fingerprint(source_profile, page_range)
+        key = cache.key(source, options_key, content_hashes.get(source))
+        markdown_path = cache.markdown_path(key)
+        if markdown_path is None:
+            pending.append((source, key, source_profile))
+        else:
+            shutil.copyfile(markdown_path, output_paths[source])
+            chunks = chunk_document(cache.load_document(key), source) if with_chunks else None
+            yield str(source), str(output_paths[source]), time.perf_counter() - started, None, chunks
+
+    if not pending:
+        return
+
+    max_workers = max_workers or max(1, (os.cpu_count() or 1) // 2)
+    max_workers = min(max_workers, len(pending))
+    # 워커끼리 코어를 나눠 쓰도록 torch 스레드 수를 제한
+    num_threads = max(1, (os.cpu_count() or 1) // max_workers)
+
+    # torch가 fork와 잘 맞지 않아서 spawn 컨텍스트 사용
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(num_threads, cache_dir, profile),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _convert_one, str(source), str(output_paths[source]), key, source_profile,
+                page_range, stream_window, with_chunks,
+            )
+            for source, key, source_profile in pending
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Docling 문서 변환")
+    parser.add_argument("inputs", nargs="*", help="변환할 파일 또는 디렉터리 (없으면 data/transformer.pdf)")
+    parser.add_argument("-o", "--output-dir", default="output", help="일괄 변환 결과(.md)를 저장할 디렉터리")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 코어 수의 절반)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="변환 결과 캐시 디렉터리")
+    parser.add_argument("--no-cache", action="store_true", help="캐시를 쓰지 않고 항상 새로 변환")
+    parser.add_argument("--stream", action="store_true", help="페이지 단위로 변환/출력해서 메모리 사용량을 일정하게 유지")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="스트리밍 모드에서 한 번에 변환할 페이지 수")
+    parser.add_argument("--index", default=None, help="청크 임베딩을 저장할 벡터 인덱스(SQLite) 경로")
+    parser.add_argument("--incremental", action="store_true", help="매니페스트와 비교해서 새로 생기거나 바뀐 파일만 처리")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="증분 처리용 매니페스트 경로")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE, help="변환 프로필 (profiles.py 참고)")
+    parser.add_argument("--pages", type=parse_page_range, default=None, help="변환할 페이지 범위 (예: 3-10)")
+    parser.add_argument("--preview", type=int, default=None, help="앞에서부터 N페이지만 변환")
+    args = parser.parse_args()
+    if args.incremental and not args.inputs:
+        parser.error("--incremental은 변환할 파일 또는 디렉터리를 지정해야 합니다")
+    if args.pages and args.preview:
+        parser.error("--pages와 --preview는 함께 쓸 수 없습니다")
+    if args.preview is not None and args.preview < 1:
+        parser.error("--preview는 1 이상이어야 합니다")
+    page_range = args.pages or ((1, args.preview) if args.preview else None)
+    cache_dir = None if args.no_cache else args.cache_dir
+    stream_window = args.window if args.stream else None
+
+    index = embedder = None
+    if args.index:
+        # 무거운 임베딩 모델은 인덱싱할 때만 로딩
+        from embedding import LocalEmbedder
+        from index import VectorIndex
+
+        embedder = LocalEmbedder()
+        index = VectorIndex(args.index, dims=embedder.dims)
+
+    if not args.inputs:
+        profile = resolve_profile(args.profile, SOURCE)
+        converter = create_converter(profile)
+
+    if not args.inputs and stream_window:
+        chunks = []
+        on_window = (lambda document: chunks.extend(chunk_document(document, SOURCE))) if index else None
+        write_markdown_stream(iter_page_markdown(converter, SOURCE, stream_window, on_window, page_range))
+        if index:
+            index_chunks(index, embedder, chunks, replace_source=SOURCE)
+        return
+
+    if not args.inputs:
+        cache = ConversionCache(cache_dir) if cache_dir else None
+        document, markdown_path = convert_cached(
+            converter, SOURCE, cache, profile_fingerprint(profile, page_range), page_range
+        )
+        if markdown_path is not None:
+            print(Path(markdown_path).read_text(encoding="utf-8"))
+        else:
+            print(document.export_to_markdown()) # 마크다운으로 출력
+        if index:
+            count = index_chunks(index, embedder, chunk_document(document, SOURCE), replace_source=SOURCE)
+            print(f"🔎 청크 {count}개를 {args.index}에 색인했습니다")
+        return
+
+    sources = collect_sources(args.inputs)
+    started = time.perf_counter()
+    # 출력 경로는 전체 소스 기준으로 정해서 증분 실행 때도 같은 파일은 같은 이름으로 나감
+    output_paths = _output_paths(sources, args.output_dir)
+    content_hashes = {}
+
+    manifest = None
+    if args.incremental:
+        manifest = Manifest(args.manifest)
+        changed, unchanged, deleted = manifest.diff(sources)
+        for source in deleted:
+            entry = manifest.remove(source)
+            if entry and entry.get("output"):
+                Path(entry["output"]).unlink(missing_ok=True)
+            if index:
+                index.delete_source(source)
+        manifest.save()
+        print(f"🧾 매니페스트: 변경 {len(changed)}개, 유지 {len(unchanged)}개, 삭제 {len(deleted)}개")
+        content_hashes = dict(changed)
+        sources = [source for source, _ in changed]
+
+    print(f"📄 변환 대상: {len(sources)}개 파일")
+
+    done = failed = 0
+    results = convert_batch(
+        sources, args.output_dir, args.workers, cache_dir, stream_window, with_chunks=index is not None,
+        output_paths=output_paths, content_hashes=content_hashes, profile=args.profile, page_range=page_range,
+    )
+    try:
+        for source, output, elapsed, error, chunks in results:
+            if error:
+                failed += 1
+                print(f"❌ {source} ({elapsed:.1f}s): {error}")
+                continue
+
+            done += 1
+            print(f"✅ {source} -> {output} ({elapsed:.1f}s)")
+            if index:
+                # 워커가 다음 파일을 변환하는 동안 메인 프로세스에서 임베딩/색인
+                count = index_chunks(index, embedder, chunks, replace_source=source)
+                print(f"   🔎 청크 {count}개 색인")
+            if manifest is not None:
+                # 색인까지 끝난 파일만 기록해서, 중간에 죽으면 다음 실행 때 다시 처리됨
+                manifest.record(source, content_hashes[Path(source)], output)
+                if done % 50 == 0:
+                    manifest.save()
+    finally:
+        if manifest is not None:
+            manifest.save()
+
+    total = time.perf_counter() - started
+    print(f"완료: 성공 {done}개, 실패 {failed}개, 총 {total:.1f}s")
+    if manifest is not None and index and done:
+        print("💡 ANN 인덱스를 쓰고 있다면 python ann.py build 로 다시 빌드하세요")
+
 
-source = "data/transformer.pdf"
-converter = DocumentConverter()
-result = converter.convert(source)
-print(result.document.export_to_markdown()) # 마크다운으로 출력
+if __name__ == "__main__":
+    main()
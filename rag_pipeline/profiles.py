@@ -0,0 +1,109 @@
+"""
+Docling 변환 프로필
+
+기본 DocumentConverter()는 레이아웃 + 표 구조 + OCR 모델을 모두 돌리는데,
+transformer.pdf처럼 텍스트 레이어가 이미 있는 PDF는 OCR이 필요 없음.
+문서 종류에 따라 정확도와 처리량을 맞바꿀 수 있도록 프로필을 나눔.
+
+    full  레이아웃 + 표 구조 + OCR (기본값, 스캔 문서도 처리)
+    fast  OCR / 표 구조 모델 생략, docling-parse 백엔드 (텍스트 레이어가 없으면 full로 전환)
+    text  OCR / 표 구조 모델 생략, 가벼운 pypdfium2 백엔드 (텍스트 레이어가 없으면 full로 전환)
+
+페이지 범위(--pages 3-10)와 앞부분 미리보기(--preview 5)는 프로필과 함께 쓸 수 있음.
+프로필별 pages/sec 수치는 bench_profiles.py로 측정함.
+"""
+import argparse
+
+import pypdfium2
+from docling.backend.docling_parse_v4_backend import DoclingParseV4DocumentBackend
+from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.pipeline_options import AcceleratorOptions, PdfPipelineOptions
+from docling.document_converter import DocumentConverter, PdfFormatOption
+
+from cache import options_fingerprint
+
+PROFILES = {
+    "full": {"do_ocr": True, "do_table_structure": True, "backend": "docling_parse"},
+    "fast": {"do_ocr": False, "do_table_structure": False, "backend": "docling_parse"},
+    "text": {"do_ocr": False, "do_table_structure": False, "backend": "pypdfium"},
+}
+DEFAULT_PROFILE = "full"
+
+# 텍스트 레이어가 있어야만 쓸 수 있는 프로필
+_TEXT_LAYER_PROFILES = {"fast", "text"}
+
+_BACKENDS = {
+    "docling_parse": DoclingParseV4DocumentBackend,
+    "pypdfium": PyPdfiumDocumentBackend,
+}
+
+
+def has_text_layer(source, sample_pages=3, min_chars=50):
+    """앞쪽 몇 페이지에 추출 가능한 텍스트가 있는지 확인 (스캔 PDF면 False)"""
+    pdf = pypdfium2.PdfDocument(str(source))
+    try:
+        chars = 0
+        for i in range(min(sample_pages, len(pdf))):
+            textpage = pdf[i].get_textpage()
+            chars += len(textpage.get_text_range().strip())
+            textpage.close()
+            if chars >= min_chars:
+                return True
+        return False
+    finally:
+        pdf.close()
+
+
+def resolve_profile(profile, source):
+    """텍스트 레이어가 필요한 프로필인데 스캔 문서면 full로 바꿔서 반환"""
+    if profile in _TEXT_LAYER_PROFILES and not has_text_layer(source):
+        return "full"
+    return profile
+
+
+def create_pipeline_options(profile=DEFAULT_PROFILE, num_threads=None):
+    """프로필에 맞는 PDF 파이프라인 옵션 생성 (num_threads를 주면 torch 스레드 수를 제한)"""
+    settings = PROFILES[profile]
+    pipeline_options = PdfPipelineOptions(
+        do_ocr=settings["do_ocr"],
+        do_table_structure=settings["do_table_structure"],
+    )
+    if num_threads is not None:
+        pipeline_options.accelerator_options = AcceleratorOptions(num_threads=num_threads)
+    return pipeline_options
+
+
+def create_converter(profile=DEFAULT_PROFILE, num_threads=None):
+    """프로필에 맞는 DocumentConverter 생성"""
+    format_option = PdfFormatOption(
+        pipeline_options=create_pipeline_options(profile, num_threads),
+        backend=_BACKENDS[PROFILES[profile]["backend"]],
+    )
+    return DocumentConverter(format_options={InputFormat.PDF: format_option})
+
+
+def profile_fingerprint(profile=DEFAULT_PROFILE, page_range=None):
+    """캐시 키에 쓸 프로필 해시 (파이프라인 옵션 + 백엔드 + 페이지 범위)"""
+    return options_fingerprint(
+        create_pipeline_options(profile),
+        extra={"backend": PROFILES[profile]["backend"], "page_range": page_range},
+    )
+
+
+def parse_page_range(text):
+    """'3-10' -> (3, 10), '5' -> (5, 5) (argparse type=으로 쓰도록 잘못된 값은 ArgumentTypeError)"""
+    start, _, end = text.partition("-")
+    try:
+        start = int(start)
+        end = int(end) if end else start
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"잘못된 페이지 범위입니다: {text} (예: 3-10 또는 5)") from None
+    if start < 1 or end < start:
+        raise argparse.ArgumentTypeError(f"잘못된 페이지 범위입니다: {text} (1 이상, 시작 <= 끝)")
+    return start, end
+
+
+def convert_kwargs(page_range=None):
+    """DocumentConverter.convert()에 넘길 페이지 범위 인자"""
+    return {"page_range": page_range} if page_range else {}
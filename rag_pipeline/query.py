@@ -0,0 +1,90 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+"""
+벡터 인덱스에 질문하기
+
+사용법:
+    python query.py "What is multi-head attention?"              # 관련 청크 검색
+    python query.py "What is multi-head attention?" --answer     # 검색한 청크로 LLM 답변 생성
+    python query.py "What is multi-head attention?" --ann rag_ann --nprobe 16   # IVF ANN 인덱스로 검색
+"""
+import argparse
+import time
+
+from ann import DEFAULT_NPROBE, IVFIndex
+from embedding import LocalEmbedder
+from index import DEFAULT_INDEX_PATH, VectorIndex
+
+
+def retrieve(index, embedder, question, k=5, ann=None, nprobe=None):
+    """
+    질문을 임베딩해서 가장 가까운 청크 k개를 찾음
+
+    ann(IVFIndex)을 주면 근사 검색으로 id를 찾고 텍스트만 SQLite에서 가져옴
+    """
+    query = embedder.embed_query(question)
+    if ann is None:
+        return index.search(query, k=k)
+
+    results = ann.search(query, k=k, nprobe=nprobe)
+    scores = dict(results)
+    hits = index.get_chunks([chunk_id for chunk_id, _ in results])
+    for hit in hits:
+        hit["score"] = scores[hit["id"]]
+    return hits
+
+
+def answer(question, hits):
+    """검색된 청크를 근거로 LLM 답변 생성"""
+    from langchain_openai import ChatOpenAI
+
+    context = "\n\n".join(
+        f"[{i + 1}] ({hit['source']} p.{hit['page_no']}) {' > '.join(hit['headings'])}\n{hit['text']}"
+        for i, hit in enumerate(hits)
+    )
+    prompt = f"""
+    아래 문서 조각만 근거로 질문에 답변해주세요.
+    근거로 사용한 조각 번호를 [1]처럼 표시하고, 문서에 없는 내용이면 모른다고 답변해주세요.
+
+    문서 조각:
+    {context}
+
+    질문: {question}
+    """
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    return llm.invoke(prompt).content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 인덱스 검색")
+    parser.add_argument("question", help="질문")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="벡터 인덱스(SQLite) 경로")
+    parser.add_argument("-k", type=int, default=5, help="가져올 청크 수")
+    parser.add_argument("--answer", action="store_true", help="검색 결과로 LLM 답변까지 생성")
+    parser.add_argument("--ann", default=None, help="IVF ANN 인덱스 디렉터리 (ann.py build로 생성)")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="ANN 검색 시 뒤져볼 클러스터 수 (recall/지연 시간 조절)")
+    args = parser.parse_args()
+
+    embedder = LocalEmbedder()
+    index = VectorIndex(args.index, dims=embedder.dims)
+    ann = IVFIndex(args.ann) if args.ann else None
+
+    started = time.perf_counter()
+    hits = retrieve(index, embedder, args.question, k=args.k, ann=ann, nprobe=args.nprobe)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"🔎 {index.count()}개 청크 중 {len(hits)}개 검색 ({elapsed_ms:.1f}ms)")
+    for i, hit in enumerate(hits):
+        print(f"\n[{i + 1}] score={hit['score']:.3f} {hit['source']} p.{hit['page_no']}")
+        if hit["headings"]:
+            print("    " + " > ".join(hit["headings"]))
+        print("    " + hit["text"][:300].replace("\n", " "))
+
+    if args.answer:
+        print("\n=== 답변 ===")
+        print(answer(args.question, hits))
+
+
+if __name__ == "__main__":
+    main()
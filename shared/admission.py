@@ -0,0 +1,185 @@
+"""
+여러 Streamlit 세션이 같이 쓰는 LLM 호출 입장 제어(admission control)
+
+Streamlit은 세션마다 스크립트 스레드에서 LLM을 동기로 호출하기 때문에
+사용자가 몰리면 동시 호출 수가 그대로 늘어나서 OpenAI rate limit 오류가 남.
+AdmissionController는 프로세스 안의 모든 세션이 공유하는 관문으로
+- 동시에 실행되는 호출 수를 max_concurrency로 제한하고
+- 기다리는 호출은 세션별 대기열에 넣어 세션끼리 돌아가며(round-robin) 차례를 줌
+  (한 세션이 요청을 여러 개 넣어도 다른 세션이 밀리지 않음)
+- 대기열이 가득 차거나 너무 오래 기다리면 OpenAI까지 가지 않고 바로 Overloaded를 발생시킴
+
+호출 자체는 자리를 받은 세션의 스크립트 스레드에서 그대로 실행함
+(스트리밍 중 화면 갱신은 Streamlit 스크립트 스레드에서만 할 수 있기 때문).
+
+사용 예:
+    admission = AdmissionController(max_concurrency=4)
+    with admission.slot(session_id, on_wait=lambda position, waited: ...):
+        for chunk in chain.stream(...):
+            ...
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+DEFAULT_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 64))
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 60))
+# 대기 시간 통계에 쓰는 최근 표본 수
+_WAIT_SAMPLES = 500
+
+
+class Overloaded(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 호출을 받지 않음"""
+
+
+class _Ticket:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+        self.granted = threading.Event()
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdmissionController:
+    """동시 실행 수 제한 + 세션 간 공정한 대기열"""
+
+    def __init__(
+        self,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        max_queue=DEFAULT_MAX_QUEUE,
+        queue_timeout=DEFAULT_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiting = OrderedDict()  # session_id -> deque[_Ticket] (앞쪽 세션이 다음 차례)
+        self._queued = 0
+        self._active = 0
+        self._wait_times = deque(maxlen=_WAIT_SAMPLES)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+
+    def _grant_next(self):
+        """빈 자리가 있으면 다음 차례 세션의 가장 오래된 요청을 입장시킴 (self._lock 안에서 호출)"""
+        while self._active < self.max_concurrency and self._waiting:
+            session_id, tickets = next(iter(self._waiting.items()))
+            ticket = tickets.popleft()
+            # 이번 세션은 맨 뒤로 보내서 다른 세션에 차례를 넘김
+            if tickets:
+                self._waiting.move_to_end(session_id)
+            else:
+                del self._waiting[session_id]
+            self._queued -= 1
+            self._active += 1
+            ticket.granted.set()
+
+    def _position(self, ticket):
+        """앞에서 기다리는 요청 수 (세션 순서대로 돌아가며 입장하는 것을 반영한 추정치)"""
+        with self._lock:
+            tickets = self._waiting.get(ticket.session_id)
+            if tickets is None or ticket not in tickets:
+                return 0
+            rounds = tickets.index(ticket)
+            ahead = 0
+            for session_id, other in self._waiting.items():
+                if session_id == ticket.session_id:
+                    ahead += rounds
+                    continue
+                ahead += min(len(other), rounds + 1)
+            return ahead
+
+    def _cancel(self, ticket):
+        """기다리다 포기한 요청을 대기열에서 제거. 이미 입장한 경우 False (이미 제거된 경우 True)"""
+        with self._lock:
+            if ticket.granted.is_set():
+                return False
+            tickets = self._waiting.get(ticket.session_id)
+            if tickets is None or ticket not in tickets:
+                return True
+            tickets.remove(ticket)
+            if not tickets:
+                del self._waiting[ticket.session_id]
+            self._queued -= 1
+            return True
+
+    def acquire(self, session_id, on_wait=None, poll_interval=0.5):
+        """
+        자리를 받을 때까지 대기하고, 기다린 시간(초)을 반환
+
+        on_wait(position, waited)는 기다리는 동안 poll_interval마다 호출됨 (대기 안내 표시용)
+        """
+        ticket = _Ticket(session_id)
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"대기 중인 요청이 너무 많습니다 ({self._queued}개)")
+            self._waiting.setdefault(session_id, deque()).append(ticket)
+            self._queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queued)
+            self._grant_next()
+
+        try:
+            while not ticket.granted.wait(poll_interval):
+                waited = time.monotonic() - ticket.enqueued_at
+                if self.queue_timeout is not None and waited >= self.queue_timeout and self._cancel(ticket):
+                    with self._lock:
+                        self.timed_out += 1
+                    raise Overloaded(f"{waited:.0f}초 동안 차례가 오지 않았습니다")
+                if on_wait is not None:
+                    on_wait(self._position(ticket), waited)
+        except BaseException:
+            # on_wait가 예외를 내면(Streamlit 재실행/중지 등) 대기열에서 빼고,
+            # 그 사이에 이미 입장했다면 받은 자리를 돌려줌
+            if not self._cancel(ticket):
+                self.release()
+            raise
+
+        waited = time.monotonic() - ticket.enqueued_at
+        with self._lock:
+            self.admitted += 1
+            self._wait_times.append(waited)
+        return waited
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, session_id, on_wait=None):
+        """with 블록 동안 실행 자리 하나를 차지함"""
+        waited = self.acquire(session_id, on_wait=on_wait)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def stats(self):
+        """대기열 깊이, 실행 중인 호출 수, 대기 시간 분포"""
+        with self._lock:
+            wait_times = list(self._wait_times)
+            return {
+                "active": self._active,
+                "max_concurrency": self.max_concurrency,
+                "queue_depth": self._queued,
+                "max_queue_depth": self.max_queue_depth,
+                "waiting_sessions": len(self._waiting),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_p50": round(_percentile(wait_times, 0.5), 3),
+                "wait_p95": round(_percentile(wait_times, 0.95), 3),
+                "wait_max": round(max(wait_times, default=0.0), 3),
+            }
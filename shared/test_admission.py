@@ -0,0 +1,51 @@
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+class _Stop(BaseException):
+    """Streamlit의 StopException/RerunException 대용"""
+
+
+def test_on_wait_exception_removes_waiting_ticket():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=5)
+    admission.acquire("holder")
+
+    def stop(position, waited):
+        raise _Stop()
+
+    with pytest.raises(_Stop):
+        admission.acquire("waiter", on_wait=stop, poll_interval=0.01)
+    assert admission.stats()["queue_depth"] == 0
+
+    admission.release()
+    assert admission.stats()["active"] == 0
+    with admission.slot("next"):
+        assert admission.stats()["active"] == 1
+    assert admission.stats()["active"] == 0
+
+
+def test_on_wait_exception_after_grant_releases_slot():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=5)
+    admission.acquire("holder")
+
+    def release_then_stop(position, waited):
+        # 자리가 난 직후(이미 입장 처리된 뒤)에 화면 갱신이 중단되는 경우
+        admission.release()
+        raise _Stop()
+
+    with pytest.raises(_Stop):
+        admission.acquire("waiter", on_wait=release_then_stop, poll_interval=0.01)
+    stats = admission.stats()
+    assert stats["active"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_timeout_raises_overloaded_and_frees_queue():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    admission.acquire("holder")
+    with pytest.raises(Overloaded):
+        admission.acquire("waiter", poll_interval=0.01)
+    assert admission.stats()["queue_depth"] == 0
+    admission.release()
+    assert admission.stats()["active"] == 0
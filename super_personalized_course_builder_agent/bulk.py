@@ -0,0 +1,317 @@
+"""
+전체 사용자 코스명 일괄 생성
+
+run_course_generator()는 사용자 한 명마다 그래프를 새로 만들고 하나씩 실행함.
+여기서는 그래프를 한 번만 컴파일해서 asyncio로 여러 사용자를 동시에 실행하고,
+- LLM 요청은 토큰 버킷(create_llm의 rate_limiter)으로 OpenAI 요금제의 분당 요청 수에 맞춰 흘려보냄
+- 429가 클라이언트 재시도 후에도 계속되면 사용자 단위로 지수 백오프 후 다시 실행함
+- 결과는 끝나는 대로 JSONL 파일에 한 줄씩 추가하므로 중간에 멈춰도 이어서 실행할 수 있음
+- 처리량(users/min)을 주기적으로 출력함
+- --cache를 주면 프로필/관심사가 같거나(--semantic-threshold를 주면 비슷한) 사용자의 승인된 코스명을 재사용함
+- --checkpoint-db를 주면 사용자별 실행 상태를 노드마다 저장해서, 죽었다 다시 실행해도 끝난 노드는 다시 호출하지 않음
+  (--resume은 입력 파일 없이 체크포인트에 남아 있는 중단된 실행만 이어서 끝냄)
+
+입력 JSONL 한 줄 형식:
+    {"user_id": "u1", "user_profiles": [...], "user_interests": [...]}
+    (user_id가 없으면 "line-<줄 번호>"를 id로 사용)
+
+사용법:
+    python bulk.py users.jsonl -o courses.jsonl
+    python bulk.py users.jsonl -o courses.jsonl --concurrency 16 --rpm 5000 --mode batched
+    python bulk.py users.jsonl -o courses.jsonl --cache course_cache.db --semantic-threshold 0.95
+    python bulk.py users.jsonl -o courses.jsonl --checkpoint-db course_runs.db
+    python bulk.py --resume -o courses.jsonl --checkpoint-db course_runs.db
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+
+import openai
+from langchain_openai import OpenAIEmbeddings
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+import main
+from course_cache import CourseCache
+from main import CHECKPOINT_DB_PATH, GRAPH_BUILDERS, create_initial_state, create_llm, use_thread_pool
+
+DEFAULT_CONCURRENCY = 8
+# 동시 실행 수 외에 스레드 풀에 더 두는 여유 스레드 수
+EXTRA_THREADS = 4
+# 사용자 단위 재시도 횟수와 첫 대기 시간(초) - 대기 시간은 재시도마다 두 배
+MAX_USER_RETRIES = 4
+BACKOFF_BASE = 5.0
+# 진행 상황을 출력하는 간격 (완료한 사용자 수)
+REPORT_EVERY = 50
+
+
+def load_users(path):
+    """JSONL 파일에서 사용자 데이터를 하나씩 읽음"""
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            user = json.loads(line)
+            user.setdefault("user_id", f"line-{i}")
+            yield user
+
+
+def run_thread_id(mode, user_id):
+    """사용자별 체크포인트 thread id (모드마다 그래프 노드가 달라서 모드를 같이 넣음)"""
+    return f"{mode}:{user_id}"
+
+
+async def load_unfinished(app, checkpointer, mode):
+    """체크포인트에 남아 있는 중단된 실행을 사용자 데이터 형태로 반환"""
+    prefix = f"{mode}:"
+    await checkpointer.setup()
+    async with checkpointer.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+        thread_ids = [row[0] async for row in cursor if row[0].startswith(prefix)]
+
+    users = []
+    for thread_id in thread_ids:
+        snapshot = await app.aget_state({"configurable": {"thread_id": thread_id}})
+        if snapshot.next:
+            users.append({
+                "user_id": thread_id[len(prefix):],
+                "user_profiles": snapshot.values["user_profiles"],
+                "user_interests": snapshot.values["user_interests"],
+            })
+    return users
+
+
+async def _invoke(app, user, mode, checkpointer):
+    """그래프 실행 - 체크포인트가 있으면 끝난 실행은 저장된 결과를, 중단된 실행은 이어서 실행"""
+    if checkpointer is None:
+        return await app.ainvoke(create_initial_state(user))
+
+    config = {"configurable": {"thread_id": run_thread_id(mode, user["user_id"])}}
+    snapshot = await app.aget_state(config)
+    if snapshot.values and not snapshot.next:
+        return snapshot.values
+    if snapshot.values:
+        return await app.ainvoke(None, config)
+    return await app.ainvoke(create_initial_state(user), config)
+
+
+def load_completed(output_path):
+    """이미 결과가 저장된 사용자 id (이어서 실행할 때 건너뜀)"""
+    done = set()
+    path = Path(output_path)
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["user_id"])
+            except (json.JSONDecodeError, KeyError):
+                # 중간에 끊겨서 반쯤 쓰인 마지막 줄은 무시
+                continue
+    return done
+
+
+async def _run_user(app, user, semaphore, mode, cache=None, checkpointer=None):
+    """사용자 한 명 실행 (rate limit 오류는 백오프 후 재시도, 실패하면 error가 담긴 결과 반환)"""
+    async with semaphore:
+        if cache is not None:
+            started = time.perf_counter()
+            try:
+                # 임베딩 조회는 동기 호출이라 스레드에서 실행
+                hit = await asyncio.to_thread(cache.get, user)
+            except Exception as e:
+                # 임베딩 API 오류/429 같은 캐시 실패로 전체 작업을 멈추지 않도록 캐시 미스로 처리
+                print(f"⚠️ {user['user_id']}: 코스명 캐시 조회 실패, 그래프로 실행 ({e})")
+                hit = None
+            if hit:
+                course_name, cache_kind = hit
+                return {
+                    "user_id": user["user_id"],
+                    "course_name": course_name,
+                    "course_approved": True,
+                    "rounds": 0,
+                    "cache": cache_kind,
+                    "decided_by": "cache",
+                    "rule_rejections": 0,
+                    "llm_validations": 0,
+                    "elapsed": round(time.perf_counter() - started, 3),
+                }
+
+        for attempt in range(MAX_USER_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                # 재시도할 때도 체크포인트가 있으면 실패한 노드부터 다시 실행됨
+                result = await _invoke(app, user, mode, checkpointer)
+                break
+            except openai.RateLimitError as e:
+                if attempt == MAX_USER_RETRIES:
+                    return {"user_id": user["user_id"], "error": str(e)}
+                delay = BACKOFF_BASE * 2 ** attempt
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            except Exception as e:
+                return {"user_id": user["user_id"], "error": str(e)}
+
+        if cache is not None and result["course_approved"]:
+            try:
+                await asyncio.to_thread(cache.put, user, result["course_name"])
+            except Exception as e:
+                # 결과는 이미 나왔으므로 캐시 저장 실패는 건너뜀
+                print(f"⚠️ {user['user_id']}: 코스명 캐시 저장 실패 ({e})")
+
+    return {
+        "user_id": user["user_id"],
+        "course_name": result["course_name"],
+        "course_approved": result["course_approved"],
+        "rounds": result["rounds"],
+        "cache": None,
+        "decided_by": result["decided_by"],
+        # 로컬 규칙에서 걸러져 LLM 검증을 하지 않은 후보 수 / LLM으로 검증한 후보 수
+        "rule_rejections": sum(1 for entry in result["validation_log"] if entry["tier"] == "rules"),
+        "llm_validations": sum(1 for entry in result["validation_log"] if entry["tier"] == "llm"),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+async def generate_bulk(
+    users,
+    output_path,
+    concurrency=DEFAULT_CONCURRENCY,
+    mode="batched",
+    requests_per_minute=None,
+    cache=None,
+    checkpointer=None,
+    resume_only=False,
+):
+    """
+    여러 사용자의 코스명을 동시에 생성해서 output_path(JSONL)에 추가
+
+    users: 사용자 데이터 이터러블 (user_id, user_profiles, user_interests)
+    cache: 승인된 코스명을 재사용할 CourseCache (없으면 모든 사용자를 그래프로 실행)
+    checkpointer: 사용자별 실행 상태를 저장할 비동기 체크포인터 (결과 파일에 쓰고 나면 해당 체크포인트는 지움)
+    resume_only: True면 users 대신 체크포인트에 남은 중단된 실행만 이어서 실행
+    이미 output_path에 결과가 있는 사용자는 건너뜀.
+    반환값: {"done", "skipped", "failed", "seconds", "users_per_min", "rule_rejections", "llm_validations"}
+    """
+    # 노드가 동기 함수라서 스레드 풀 크기가 곧 실제 동시 실행 수 - concurrency만큼 실행되도록 늘림
+    use_thread_pool(concurrency + EXTRA_THREADS)
+    if requests_per_minute is not None:
+        # 노드들이 참조하는 모듈 전역 LLM을 요청 한도에 맞춘 것으로 교체
+        main.llm = create_llm(requests_per_minute)
+    app = GRAPH_BUILDERS[mode](checkpointer=checkpointer)
+    if resume_only:
+        users = await load_unfinished(app, checkpointer, mode)
+
+    completed = load_completed(output_path)
+    pending = [user for user in users if user["user_id"] not in completed]
+    print(f"👥 사용자 {len(pending) + len(completed)}명 (이미 완료 {len(completed)}명, 남은 사용자 {len(pending)}명)")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    error_path = Path(f"{output_path}.errors.jsonl")
+    done = 0
+    failed = 0
+    rule_rejections = 0
+    llm_validations = 0
+    started = time.perf_counter()
+
+    tasks = [_run_user(app, user, semaphore, mode, cache, checkpointer) for user in pending]
+    with open(output_path, "a", encoding="utf-8") as out, open(error_path, "a", encoding="utf-8") as err:
+        for future in asyncio.as_completed(tasks):
+            record = await future
+            if "error" in record:
+                # 실패한 사용자는 결과 파일에 쓰지 않으므로 다음 실행 때 다시 시도됨
+                failed += 1
+                err.write(json.dumps(record, ensure_ascii=False) + "\n")
+                err.flush()
+                print(f"❌ {record['user_id']}: {record['error']}")
+                continue
+
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if checkpointer is not None:
+                # 결과가 파일에 남았으므로 체크포인트는 더 이상 필요 없음
+                await checkpointer.adelete_thread(run_thread_id(mode, record["user_id"]))
+            done += 1
+            rule_rejections += record["rule_rejections"]
+            llm_validations += record["llm_validations"]
+            if done % REPORT_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"⏱️ {done}/{len(pending)}명 완료, {done / elapsed * 60:.1f} users/min")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "done": done,
+        "skipped": len(completed),
+        "failed": failed,
+        "seconds": round(elapsed, 1),
+        "users_per_min": round(done / elapsed * 60, 1) if elapsed else 0.0,
+        "rule_rejections": rule_rejections,
+        "llm_validations": llm_validations,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="전체 사용자 코스명 일괄 생성")
+    parser.add_argument("input", nargs="?", help="사용자 데이터 JSONL 파일 (--resume이면 생략)")
+    parser.add_argument("-o", "--output", default="courses.jsonl", help="결과 JSONL 파일 (있으면 이어서 실행)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시에 실행할 사용자 수")
+    parser.add_argument("--rpm", type=int, default=None, help="OpenAI 분당 요청 수 한도 (기본: OPENAI_RPM 환경 변수)")
+    parser.add_argument("--mode", choices=sorted(GRAPH_BUILDERS), default="batched", help="그래프 실행 모드")
+    parser.add_argument("--cache", default=None, help="코스명 캐시 SQLite 파일 (주면 승인된 코스명을 재사용)")
+    parser.add_argument(
+        "--semantic-threshold", type=float, default=None,
+        help="프로필/관심사 임베딩 유사도가 이 값 이상이면 캐시 재사용 (--cache와 함께 사용)",
+    )
+    parser.add_argument(
+        "--checkpoint-db", default=None,
+        help=f"사용자별 실행 상태를 저장할 SQLite 파일 (예: {CHECKPOINT_DB_PATH}), 다시 실행하면 끝난 노드는 건너뜀",
+    )
+    parser.add_argument("--resume", action="store_true", help="체크포인트에 남아 있는 중단된 실행만 이어서 실행")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint_db:
+        parser.error("--resume은 --checkpoint-db와 함께 사용해야 합니다")
+    if not args.resume and not args.input:
+        parser.error("입력 JSONL 파일이 필요합니다")
+
+    cache = None
+    if args.cache and args.semantic_threshold is not None:
+        cache = CourseCache(
+            args.cache,
+            embeddings=OpenAIEmbeddings(model="text-embedding-3-small"),
+            similarity_threshold=args.semantic_threshold,
+        )
+    elif args.cache:
+        cache = CourseCache(args.cache)
+
+    async def run():
+        users = [] if args.resume else load_users(args.input)
+        options = dict(
+            concurrency=args.concurrency,
+            mode=args.mode,
+            requests_per_minute=args.rpm,
+            cache=cache,
+            resume_only=args.resume,
+        )
+        if not args.checkpoint_db:
+            return await generate_bulk(users, args.output, **options)
+        async with AsyncSqliteSaver.from_conn_string(args.checkpoint_db) as checkpointer:
+            return await generate_bulk(users, args.output, checkpointer=checkpointer, **options)
+
+    report = asyncio.run(run())
+    print(
+        f"\n✅ 완료 {report['done']}명, 건너뜀 {report['skipped']}명, 실패 {report['failed']}명 "
+        f"({report['seconds']}초, {report['users_per_min']} users/min)"
+    )
+    checked = report["rule_rejections"] + report["llm_validations"]
+    if checked:
+        print(
+            f"🧹 후보 {checked}개 중 {report['rule_rejections']}개는 로컬 규칙에서 거부되어 "
+            f"LLM 검증을 건너뜀 ({report['rule_rejections'] / checked:.0%})"
+        )
+    if cache is not None:
+        print(f"🗃️ 코스명 캐시: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,226 @@
+"""
+코스명 결과 캐시
+
+프로필/관심사 목록이 거의 같은 사용자가 많은데 매번 생성 -> 검증 루프 전체를 다시 돌림.
+승인된 코스명을 프로필 + 관심사를 키로 저장해 두고 LLM 호출 없이 재사용함.
+
+조회 순서:
+1) 정확히 일치: 각 항목을 정규화(유니코드/공백/대소문자)하고 순서와 중복을 무시한 키로 찾음
+2) 의미 유사(선택): embeddings를 주면 프로필 + 관심사 임베딩의 코사인 유사도가
+   similarity_threshold 이상인 가장 가까운 항목을 재사용
+
+항목은 ttl_seconds가 지나면 만료되고, max_items를 넘으면 가장 오래 안 쓴 항목부터 지움.
+db_path를 주면 SQLite 파일에 저장해서 여러 실행(일괄 생성 작업 재시작 등)에서 같이 씀.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ITEMS = 10000
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# 조회 때 만든 임베딩을 저장 때까지 보관하는 최대 개수 (승인되지 않아 저장되지 않는 것도 있음)
+_MAX_PENDING_VECTORS = 1024
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+def normalize_user(user_data):
+    """순서/중복/대소문자/공백 차이를 없앤 (프로필, 관심사) 목록"""
+    profiles = sorted({_normalize(p) for p in user_data["user_profiles"] if p.strip()})
+    interests = sorted({_normalize(i) for i in user_data["user_interests"] if i.strip()})
+    return profiles, interests
+
+
+def cache_key(user_data):
+    """정규화한 프로필 + 관심사의 sha256"""
+    profiles, interests = normalize_user(user_data)
+    payload = json.dumps({"profiles": profiles, "interests": interests}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def embedding_text(user_data):
+    """의미 유사도 비교에 쓸 텍스트"""
+    profiles, interests = normalize_user(user_data)
+    return f"프로필: {'; '.join(profiles)}\n관심사: {'; '.join(interests)}"
+
+
+class CourseCache:
+    """정확 일치 + (선택) 임베딩 유사도 기반 코스명 캐시"""
+
+    def __init__(
+        self,
+        db_path=":memory:",
+        embeddings=None,
+        similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        max_items=DEFAULT_MAX_ITEMS,
+    ):
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS course_cache (
+                key TEXT PRIMARY KEY,
+                course_name TEXT NOT NULL,
+                vector BLOB,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        # 유사도 검색용 벡터 행렬 - 지운 항목의 행은 0으로 비우고 다음 저장 때 다시 씀
+        # (빈 행이 없을 때만 행을 추가하고 용량은 두 배씩 늘림)
+        self._matrix = None
+        self._row_keys = []  # 행 번호 -> 키 (지운 행은 None)
+        self._rows = {}  # 키 -> 행 번호
+        self._free_rows = []  # 비어 있는 행 번호
+        # 조회할 때 만든 임베딩을 저장할 때 다시 쓰도록 잠깐 보관
+        self._pending_vectors = {}
+
+    def _delete(self, where, params):
+        """조건에 맞는 항목을 지우고 유사도 행렬에서도 비움 (self._lock 안에서 호출)"""
+        keys = [row[0] for row in self._conn.execute(f"SELECT key FROM course_cache WHERE {where}", params)]
+        if not keys:
+            return
+        self._conn.executemany("DELETE FROM course_cache WHERE key = ?", [(key,) for key in keys])
+        for key in keys:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._matrix[row] = 0.0
+                self._row_keys[row] = None
+                self._free_rows.append(row)
+
+    def _expire(self, now):
+        self._delete("created_at < ?", (now - self.ttl_seconds,))
+
+    def _vector(self, key, user_data):
+        if key not in self._pending_vectors:
+            if len(self._pending_vectors) >= _MAX_PENDING_VECTORS:
+                self._pending_vectors.clear()
+            vector = np.asarray(self.embeddings.embed_query(embedding_text(user_data)), dtype=np.float32)
+            self._pending_vectors[key] = vector / (np.linalg.norm(vector) or 1.0)
+        return self._pending_vectors[key]
+
+    def _load_matrix(self):
+        """SQLite에 저장된 벡터로 유사도 행렬을 처음 만듦 (self._lock 안에서 호출)"""
+        rows = self._conn.execute("SELECT key, vector FROM course_cache WHERE vector IS NOT NULL").fetchall()
+        self._row_keys = [key for key, _ in rows]
+        self._rows = {key: i for i, key in enumerate(self._row_keys)}
+        self._free_rows = []
+        if rows:
+            self._matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def _add_row(self, key, vector):
+        """유사도 행렬에 벡터 추가 (self._lock 안에서 호출)"""
+        if self._matrix is None:
+            # 아직 한 번도 조회하지 않았으면 처음 조회할 때 SQLite에서 한꺼번에 읽음
+            return
+        if key in self._rows:
+            self._matrix[self._rows[key]] = vector
+            return
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._matrix[row] = vector
+            self._rows[key] = row
+            self._row_keys[row] = key
+            return
+        size = len(self._row_keys)
+        if size == len(self._matrix) or self._matrix.shape[1] != len(vector):
+            grown = np.zeros((max(16, size * 2), len(vector)), dtype=np.float32)
+            if size:
+                grown[:size] = self._matrix[:size]
+            self._matrix = grown
+        self._matrix[size] = vector
+        self._rows[key] = size
+        self._row_keys.append(key)
+
+    def get(self, user_data):
+        """
+        캐시된 코스명 조회
+
+        반환값: (코스명, "exact" 또는 "semantic") 또는 None
+        """
+        key = cache_key(user_data)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            row = self._conn.execute("SELECT course_name FROM course_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE course_cache SET last_used = ? WHERE key = ?", (now, key))
+                self.exact_hits += 1
+                return row[0], "exact"
+
+        if self.embeddings is not None:
+            vector = self._vector(key, user_data)
+            with self._lock:
+                if self._matrix is None:
+                    self._load_matrix()
+                if len(self._row_keys):
+                    scores = self._matrix[:len(self._row_keys)] @ vector
+                    best = int(np.argmax(scores))
+                    best_key = self._row_keys[best]
+                    if best_key is not None and scores[best] >= self.similarity_threshold:
+                        row = self._conn.execute(
+                            "SELECT course_name FROM course_cache WHERE key = ?", (best_key,)
+                        ).fetchone()
+                        self._conn.execute("UPDATE course_cache SET last_used = ? WHERE key = ?", (now, best_key))
+                        self.semantic_hits += 1
+                        self._pending_vectors.pop(key, None)
+                        return row[0], "semantic"
+
+        self.misses += 1
+        return None
+
+    def put(self, user_data, course_name):
+        """승인된 코스명 저장 (max_items를 넘으면 가장 오래 안 쓴 항목부터 삭제)"""
+        key = cache_key(user_data)
+        now = time.time()
+        vector = None
+        if self.embeddings is not None:
+            vector = self._vector(key, user_data)
+        self._pending_vectors.pop(key, None)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO course_cache (key, course_name, vector, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, course_name, None if vector is None else vector.tobytes(), now, now),
+            )
+            if vector is not None:
+                self._add_row(key, vector)
+            self._delete(
+                "key IN (SELECT key FROM course_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_items,),
+            )
+
+    def stats(self):
+        """적중 종류별 횟수와 적중률"""
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        with self._lock:
+            items = self._conn.execute("SELECT COUNT(*) FROM course_cache").fetchone()[0]
+        return {
+            "items": items,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -1,12 +1,34 @@
+import argparse
+import asyncio
 import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import TypedDict, List
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_openai import ChatOpenAI  # 또는 사용하고자 하는 LLM
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from prevalidate import normalize_course_name, prevalidate
+
 _ = load_dotenv()
 
+# 생성 -> 검증을 반복하는 최대 라운드 수 (이 안에 승인되지 않으면 마지막 후보로 종료)
+MAX_ROUNDS = 3
+# batched 모드에서 한 번에 생성하는 코스명 후보 수
+NUM_CANDIDATES = 5
+# OpenAI 요금제(tier)의 분당 요청 수 한도 - 토큰 버킷으로 이 속도를 넘지 않게 요청을 흘려보냄
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", 500))
+# 429(rate limit) / 일시적 오류 시 OpenAI 클라이언트가 지수 백오프로 재시도하는 횟수
+OPENAI_MAX_RETRIES = 6
+# 실행 중간 상태(체크포인트)를 저장하는 SQLite 파일 - 프로세스가 죽어도 마지막으로 끝난 노드 다음부터 이어서 실행
+CHECKPOINT_DB_PATH = os.getenv("COURSE_CHECKPOINT_DB", "course_runs.db")
+
+
 # 상태 정의
 class GraphState(TypedDict):
     user_profiles: List[str]
@@ -14,14 +36,39 @@ class GraphState(TypedDict):
     course_name: str
     course_approved: bool
     messages: List[str]
+    candidates: List[str]  # batched 모드에서 이번 라운드의 코스명 후보
+    rejected_names: List[str]  # 지금까지 거부된 코스명 (다음 라운드에서 피하도록)
+    rounds: int  # 지금까지 진행한 생성 라운드 수
+    validation_log: List[dict]  # 후보별 검증 기록 {"name", "tier": "rules"/"llm", "approved", "reason"}
+    decided_by: str  # 최종 결과를 결정한 단계 ("rules", "llm", "cache")
+
+
+class CourseNameCandidates(BaseModel):
+    """한 번의 호출로 생성한 코스명 후보 목록"""
+    names: List[str] = Field(description="서로 다른 한국어 코스명 후보 목록")
+
+
+def create_llm(requests_per_minute: int = OPENAI_RPM) -> ChatOpenAI:
+    """
+    분당 요청 수를 토큰 버킷으로 제한하고 429에서 백오프 재시도하는 LLM 생성
+    """
+    rate_limiter = InMemoryRateLimiter(
+        requests_per_second=requests_per_minute / 60,
+        check_every_n_seconds=0.05,
+        # 순간적으로 몰리는 요청은 최대 1초 분량까지만 허용
+        max_bucket_size=max(1, requests_per_minute // 60),
+    )
+    return ChatOpenAI(
+        model="gpt-4o",
+        temperature=0.7,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        rate_limiter=rate_limiter,
+        max_retries=OPENAI_MAX_RETRIES,
+    )
 
 
 # LLM 초기화 (OpenAI API 키 필요)
-llm = ChatOpenAI(
-    model="gpt-4o",
-    temperature=0.7,
-    api_key=os.getenv("OPENAI_API_KEY"),
-)
+llm = create_llm()
 
 
 def generate_course_name(state: GraphState) -> GraphState:
@@ -57,19 +104,15 @@ def generate_course_name(state: GraphState) -> GraphState:
     # 상태 업데이트
     state["course_name"] = course_name
     state["course_approved"] = False  # 초기값
+    state["rounds"] += 1
     state["messages"].append(f"생성된 코스명: {course_name}")
 
     return state
 
 
-def validate_course_name(state: GraphState) -> GraphState:
-    """
-    코스명이 적절한지 검증하는 노드
-    """
-    course_name = state["course_name"]
-
-    # 검증 프롬프트
-    prompt = f"""
+def _validation_prompt(course_name: str) -> str:
+    """코스명 하나를 승인/거부로 평가하는 프롬프트"""
+    return f"""
     코스명: "{course_name}"
 
     위 코스명이 다음 기준을 만족하는지 평가해주세요:
@@ -81,6 +124,34 @@ def validate_course_name(state: GraphState) -> GraphState:
     "승인" 또는 "거부" 중 하나로만 답변해주세요.
     """
 
+
+def _log_validation(state: GraphState, name: str, tier: str, approved: bool, reason: str = None):
+    """후보 하나의 검증 결과와 결정한 단계를 기록"""
+    state["validation_log"].append({"name": name, "tier": tier, "approved": approved, "reason": reason})
+    state["decided_by"] = tier
+
+
+def validate_course_name(state: GraphState) -> GraphState:
+    """
+    코스명이 적절한지 검증하는 노드
+
+    로컬 규칙으로 먼저 정리/검사하고, 규칙을 통과한 코스명만 LLM으로 검증함
+    """
+    course_name = normalize_course_name(state["course_name"])
+    state["course_name"] = course_name
+
+    # 1단계: 로컬 규칙 (빈 값, 문장, 길이, 이전 코스명 반복)
+    passed, reason = prevalidate(course_name, state["rejected_names"])
+    if not passed:
+        state["course_approved"] = False
+        state["rejected_names"].append(course_name)
+        _log_validation(state, course_name, "rules", False, reason)
+        state["messages"].append(f"코스명 검증 완료: 규칙에서 거부됨 ({reason}) - 재생성 필요")
+        return state
+
+    # 2단계: LLM 검증
+    prompt = _validation_prompt(course_name)
+
     # LLM 호출
     response = llm.invoke([HumanMessage(content=prompt)])
     validation_result = response.content.strip()
@@ -88,9 +159,12 @@ def validate_course_name(state: GraphState) -> GraphState:
     # 검증 결과에 따라 상태 업데이트
     if "승인" in validation_result:
         state["course_approved"] = True
+        _log_validation(state, course_name, "llm", True)
         state["messages"].append(f"코스명 검증 완료: 승인됨")
     else:
         state["course_approved"] = False
+        state["rejected_names"].append(course_name)
+        _log_validation(state, course_name, "llm", False)
         state["messages"].append(f"코스명 검증 완료: 거부됨 - 재생성 필요")
 
     return state
@@ -131,17 +205,106 @@ def regenerate_course_name(state: GraphState) -> GraphState:
     # 상태 업데이트
     state["course_name"] = new_course_name
     state["course_approved"] = False  # 다시 검증 필요
+    state["rounds"] += 1
     state["messages"].append(f"코스명 재생성: {new_course_name}")
 
     return state
 
 
+def generate_course_candidates(state: GraphState) -> GraphState:
+    """
+    한 번의 LLM 호출로 코스명 후보 여러 개를 생성하는 노드 (batched 모드)
+    """
+    user_profiles = state["user_profiles"]
+    user_interests = state["user_interests"]
+
+    # 프로필과 관심사를 문자열로 변환
+    profiles_text = "\n".join([f"- {profile}" for profile in user_profiles])
+    interests_text = "\n".join([f"- {interest}" for interest in user_interests])
+    rejected_text = "\n".join([f"- {name}" for name in state["rejected_names"]]) or "- 없음"
+
+    # 프롬프트 생성
+    prompt = f"""
+    사용자 프로필:
+    {profiles_text}
+
+    사용자 관심사:
+    {interests_text}
+
+    이미 거부된 코스명:
+    {rejected_text}
+
+    위 사용자의 프로필과 관심사를 종합적으로 분석하여 매력적이고 구체적인 코스명 후보를 {NUM_CANDIDATES}개 생성해주세요.
+    사용자의 배경과 관심사에 모두 부합해야 하고, 이미 거부된 코스명과 비슷한 이름은 피해주세요.
+    코스명은 한국어로 작성하고, 학습자가 흥미를 느낄 수 있도록 만들어주세요.
+    후보끼리는 서로 다른 방향으로 만들어주세요.
+    """
+
+    # LLM 호출 - 구조화된 출력으로 후보 목록을 한 번에 받음
+    response = llm.with_structured_output(CourseNameCandidates).invoke([HumanMessage(content=prompt)])
+    candidates = [name.strip() for name in response.names if name.strip()][:NUM_CANDIDATES]
+
+    # 상태 업데이트
+    state["candidates"] = candidates
+    state["course_approved"] = False
+    state["rounds"] += 1
+    state["messages"].append(f"생성된 코스명 후보 ({state['rounds']}라운드): {', '.join(candidates)}")
+
+    return state
+
+
+def validate_course_candidates(state: GraphState) -> GraphState:
+    """
+    코스명 후보들을 llm.batch로 한꺼번에 검증하고 처음 승인된 후보를 고르는 노드 (batched 모드)
+
+    로컬 규칙으로 먼저 정리/검사하고, 규칙을 통과한 후보만 LLM으로 검증함
+    """
+    candidates = [normalize_course_name(name) for name in state["candidates"]]
+
+    # 1단계: 로컬 규칙 - 같은 라운드 안의 중복 후보도 여기서 걸러짐
+    plausible = []
+    for name in candidates:
+        passed, reason = prevalidate(name, state["rejected_names"] + plausible)
+        if passed:
+            plausible.append(name)
+        else:
+            _log_validation(state, name, "rules", False, reason)
+    rule_rejected = len(candidates) - len(plausible)
+
+    # 2단계: LLM 검증 - 규칙을 통과한 후보별 검증 요청을 동시에 보냄
+    responses = llm.batch([[HumanMessage(content=_validation_prompt(name))] for name in plausible]) if plausible else []
+
+    for name, response in zip(plausible, responses):
+        if "승인" in response.content.strip():
+            state["course_name"] = name
+            state["course_approved"] = True
+            _log_validation(state, name, "llm", True)
+            state["messages"].append(f"코스명 검증 완료: '{name}' 승인됨 (규칙에서 거부 {rule_rejected}개)")
+            return state
+        _log_validation(state, name, "llm", False)
+
+    # 모두 거부되면 다음 라운드에서 피하도록 기록 (상한에 걸리면 마지막 후보로 종료)
+    state["rejected_names"].extend(name for name in candidates if name)
+    if plausible or candidates:
+        state["course_name"] = (plausible or candidates)[-1]
+    if not plausible:
+        state["decided_by"] = "rules"
+    state["course_approved"] = False
+    state["messages"].append(
+        f"코스명 검증 완료: 후보 {len(candidates)}개 모두 거부됨 (규칙 {rule_rejected}개, LLM {len(plausible)}개) - 재생성 필요"
+    )
+
+    return state
+
+
 def course_approval_router(state: GraphState) -> str:
     """
     코스명 승인 여부에 따라 다음 노드를 결정하는 조건부 라우터
     """
     if state["course_approved"]:
         return "approved"
+    elif state["rounds"] >= MAX_ROUNDS:
+        return "exhausted"
     else:
         return "rejected"
 
@@ -150,12 +313,54 @@ def finalize_course(state: GraphState) -> GraphState:
     """
     최종 승인된 코스명을 처리하는 노드
     """
-    state["messages"].append(f"최종 코스명 확정: {state['course_name']}")
+    if state["course_approved"]:
+        state["messages"].append(f"최종 코스명 확정: {state['course_name']}")
+    else:
+        state["messages"].append(f"최대 {MAX_ROUNDS}라운드 안에 승인되지 않아 마지막 코스명 사용: {state['course_name']}")
     return state
 
 
+def create_checkpointer(path: str = CHECKPOINT_DB_PATH) -> SqliteSaver:
+    """
+    그래프 실행 상태를 노드마다 저장하는 SQLite 체크포인터 생성
+    """
+    checkpointer = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    checkpointer.setup()
+    return checkpointer
+
+
+def create_batched_course_name_graph(checkpointer=None):
+    """
+    후보 여러 개를 한 번에 생성하고 llm.batch로 한꺼번에 검증하는 그래프
+
+    보통 생성 1번 + 검증 1번(동시 요청)으로 끝나서 직렬 LLM 호출이 두 번 정도로 줄어듦
+    """
+    workflow = StateGraph(GraphState)
+
+    workflow.add_node("generate_course_candidates", generate_course_candidates)
+    workflow.add_node("validate_course_candidates", validate_course_candidates)
+    workflow.add_node("finalize_course", finalize_course)
+
+    workflow.set_entry_point("generate_course_candidates")
+    workflow.add_edge("generate_course_candidates", "validate_course_candidates")
+
+    # 모두 거부되면 다시 후보 생성, 상한에 걸리면 그대로 종료
+    workflow.add_conditional_edges(
+        "validate_course_candidates",
+        course_approval_router,
+        {
+            "approved": "finalize_course",
+            "rejected": "generate_course_candidates",
+            "exhausted": "finalize_course",
+        }
+    )
+    workflow.add_edge("finalize_course", END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
 # 그래프 구성
-def create_course_name_graph():
+def create_course_name_graph(checkpointer=None):
     # StateGraph 생성
     workflow = StateGraph(GraphState)
 
@@ -177,7 +382,8 @@ def create_course_name_graph():
         course_approval_router,
         {
             "approved": "finalize_course",
-            "rejected": "regenerate_course_name"
+            "rejected": "regenerate_course_name",
+            "exhausted": "finalize_course",
         }
     )
 
@@ -188,35 +394,135 @@ def create_course_name_graph():
     workflow.add_edge("finalize_course", END)
 
     # 그래프 컴파일
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
 
     return app
 
 
-# 실행 함수
-def run_course_generator(user_data: dict):
+# 실행 모드별 그래프 생성 함수
+GRAPH_BUILDERS = {
+    "batched": create_batched_course_name_graph,
+    "sequential": create_course_name_graph,
+}
+
+
+@lru_cache(maxsize=None)
+def get_compiled_graph(mode: str = "batched"):
     """
-    코스명 생성기 실행
+    체크포인터 없는 그래프는 요청 사이에 공유하는 상태가 없으므로 모드별로 한 번만 컴파일해서 재사용
     """
-    app = create_course_name_graph()
+    return GRAPH_BUILDERS[mode]()
 
-    # 초기 상태 설정
-    initial_state = {
+
+def use_thread_pool(max_workers: int) -> ThreadPoolExecutor:
+    """
+    실행 중인 이벤트 루프의 기본 스레드 풀을 max_workers 크기로 교체
+
+    그래프 노드는 동기 함수(llm.invoke/llm.batch)라서 ainvoke()는 노드를 루프의 기본 스레드 풀에서 실행함.
+    기본 크기는 min(32, CPU 수 + 4)라서 동시 실행 수를 그보다 크게 줘도 스레드 수에서 막히므로
+    동시에 실행할 그래프 수에 맞춰 늘림 (asyncio.to_thread 호출도 같은 풀을 씀).
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="graph-node")
+    asyncio.get_running_loop().set_default_executor(executor)
+    return executor
+
+
+def create_initial_state(user_data: dict) -> GraphState:
+    """
+    사용자 데이터로 그래프 초기 상태 생성
+    """
+    return {
         "user_profiles": user_data["user_profiles"],
         "user_interests": user_data["user_interests"],
         "course_name": "",
         "course_approved": False,
-        "messages": []
+        "messages": [],
+        "candidates": [],
+        "rejected_names": [],
+        "rounds": 0,
+        "validation_log": [],
+        "decided_by": "",
     }
 
+
+# 실행 함수
+def create_cached_result(user_data: dict, course_name: str, cache_kind: str) -> GraphState:
+    """
+    캐시에서 찾은 코스명으로 그래프 실행 결과와 같은 형태의 상태 생성 (LLM 호출 없음)
+    """
+    state = create_initial_state(user_data)
+    state["course_name"] = course_name
+    state["course_approved"] = True
+    state["decided_by"] = "cache"
+    state["messages"].append(f"캐시에서 코스명 재사용 ({cache_kind}): {course_name}")
+    return state
+
+
+def run_course_generator(
+    user_data: dict = None,
+    mode: str = "batched",
+    cache=None,
+    checkpointer=None,
+    thread_id: str = None,
+):
+    """
+    코스명 생성기 실행
+
+    mode: "batched" (후보 여러 개를 한 번에 생성/검증) 또는 "sequential" (하나씩 생성 -> 검증 -> 재생성)
+    cache: CourseCache를 주면 비슷한 프로필/관심사의 승인된 코스명을 재사용하고, 새로 승인된 코스명을 저장
+    checkpointer, thread_id: 노드가 끝날 때마다 상태를 저장함. 같은 thread_id(와 같은 mode)로 다시 부르면
+        끝난 실행은 저장된 결과를 그대로 반환하고, 중단된 실행은 마지막으로 끝난 노드 다음부터 이어서 실행함
+        (이어서 실행할 때는 user_data가 없어도 됨)
+    """
+    if checkpointer is not None and thread_id is None:
+        raise ValueError("checkpointer를 쓰려면 thread_id가 필요합니다")
+
+    if checkpointer is None:
+        app = get_compiled_graph(mode)
+    else:
+        app = GRAPH_BUILDERS[mode](checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": thread_id}} if checkpointer is not None else None
+
+    if checkpointer is not None:
+        snapshot = app.get_state(config)
+        if snapshot.values and not snapshot.next:
+            # 이미 끝난 실행
+            return snapshot.values
+        if snapshot.values:
+            # 중단된 실행 - 저장된 상태에서 이어서 실행
+            result = app.invoke(None, config)
+            if cache is not None and result["course_approved"]:
+                cache.put(result, result["course_name"])
+            return result
+
+    if user_data is None:
+        raise ValueError(f"저장된 실행이 없습니다: {thread_id}")
+
+    if cache is not None and (hit := cache.get(user_data)):
+        return create_cached_result(user_data, *hit)
+
+    # 초기 상태 설정
+    initial_state = create_initial_state(user_data)
+
     # 그래프 실행
-    result = app.invoke(initial_state)
+    result = app.invoke(initial_state, config)
+
+    if cache is not None and result["course_approved"]:
+        cache.put(user_data, result["course_name"])
 
     return result
 
 
 # 사용 예시
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="코스명 생성기")
+    parser.add_argument("--mode", choices=sorted(GRAPH_BUILDERS), default="batched", help="그래프 실행 모드")
+    parser.add_argument(
+        "--thread-id", default=None,
+        help=f"실행 상태를 {CHECKPOINT_DB_PATH}에 저장할 id (중단된 뒤 같은 id로 다시 실행하면 이어서 실행)",
+    )
+    args = parser.parse_args()
+
     # 사용자 데이터 입력
     user_data = {
         "user_profiles": [
@@ -234,7 +540,8 @@ if __name__ == "__main__":
     }
 
     # 코스명 생성 실행
-    result = run_course_generator(user_data)
+    checkpointer = create_checkpointer() if args.thread_id else None
+    result = run_course_generator(user_data, mode=args.mode, checkpointer=checkpointer, thread_id=args.thread_id)
 
     print("=== 사용자 프로필 ===")
     for profile in result['user_profiles']:
@@ -247,6 +554,8 @@ if __name__ == "__main__":
     print(f"\n=== 결과 ===")
     print(f"생성된 코스명: {result['course_name']}")
     print(f"코스명 승인 여부: {result['course_approved']}")
+    print(f"진행 라운드 수: {result['rounds']}")
+    print(f"최종 결정 단계: {result['decided_by']}")
 
     print("\n=== 메시지 히스토리 ===")
     for msg in result['messages']:
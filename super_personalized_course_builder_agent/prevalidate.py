@@ -0,0 +1,115 @@
+"""
+코스명 로컬 사전 검증 (LLM 검증 앞단의 규칙 기반 단계)
+
+LLM이 돌려준 코스명에는 따옴표, "코스명:" 같은 머리말, 설명 문장이 섞여 오거나
+빈 문자열, 너무 긴 문장, 이전에 거부된 이름의 반복이 나오는 경우가 있음.
+이런 경우는 gpt-4o에 검증을 맡기지 않아도 판단할 수 있으므로
+1) normalize_course_name()으로 겉에 붙은 것들을 벗겨내고
+2) prevalidate()로 명백히 부적절한 후보를 바로 거부하고
+남은 후보만 LLM 검증으로 보냄.
+"""
+import re
+import unicodedata
+
+MIN_LENGTH = 4
+MAX_LENGTH = 40
+
+# 이름 앞뒤를 감싸는 따옴표/괄호 쌍
+_WRAPPERS = [('"', '"'), ("'", "'"), ("“", "”"), ("‘", "’"), ("「", "」"), ("『", "』"), ("《", "》"), ("<", ">"), ("[", "]"), ("**", "**"), ("*", "*"), ("`", "`")]
+# "코스명: ...", "추천 코스명 - ..." 같은 머리말
+_LABEL = re.compile(
+    r"^\s*(?:[-*•]|\d+[.)])?\s*(?:추천\s*)?(?:(?:코스|과정|강의)\s*(?:명|이름)|course\s*name|제목|title)\s*[:：\-–]\s*",
+    re.IGNORECASE,
+)
+# 설명 문장 안에 따옴표로 들어 있는 이름 (Beginner's, Life's처럼 글자 사이의 '는 따옴표로 보지 않음)
+_QUOTED = re.compile(
+    r'"(.+?)"|“(.+?)”|「(.+?)」|『(.+?)』|《(.+?)》'
+    r"|(?<![A-Za-z0-9])'(.+?)'(?![A-Za-z0-9])|(?<![A-Za-z0-9])‘(.+?)’(?![A-Za-z0-9])"
+)
+# 따옴표 앞뒤가 이런 말뿐일 때만 따옴표 안을 이름으로 봄 ('추천 코스명은 "..."입니다')
+_PROSE_BEFORE = re.compile(
+    r"\s*(?:(?:추천|제안)(?:하는|드리는|할)?\s*)?(?:(?:코스|과정|강의|강좌)\s*(?:명|이름|제목)?|이름|제목)?"
+    r"\s*(?:은|는|으로|로|:|：)?\s*"
+)
+_PROSE_AFTER = re.compile(
+    r"\s*(?:(?:을|를|으로|로|이|가)?\s*(?:추천|제안)?\s*"
+    r"(?:입니다|이에요|예요|합니다|드립니다|해요|드려요|하겠습니다|어떨까요|어떠세요))?\s*[.!?。]*\s*"
+)
+# 이름이 아니라 문장으로 끝나는 경우
+_SENTENCE_ENDINGS = ("입니다", "합니다", "습니다", "드립니다", "하세요", "보세요", "겠습니다")
+# "추천 코스명입니다:"처럼 다음 줄의 이름을 소개하는 머리말
+_LEAD_IN_ENDINGS = (":", "：")
+# 글자 사이의 '/’ (Beginner's, Life’s) - 따옴표가 아니라 아포스트로피
+_APOSTROPHE = re.compile(r"(?<=[A-Za-z0-9])['’](?=[A-Za-z0-9])")
+
+
+def _has_delimiter(inner, left, right):
+    """감싼 기호 안쪽에 같은 기호가 또 있는지 ('"AI" 시대의 "커리어"'처럼 바깥 두 기호가 한 쌍이 아닌 경우)"""
+    if left in ("'", "‘"):
+        inner = _APOSTROPHE.sub("", inner)
+    return left in inner or right in inner
+
+
+def _strip_wrappers(text):
+    changed = True
+    while changed and text:
+        changed = False
+        text = text.strip().rstrip(".。")
+        for left, right in _WRAPPERS:
+            if len(text) > len(left) + len(right) and text.startswith(left) and text.endswith(right):
+                inner = text[len(left):-len(right)]
+                if _has_delimiter(inner, left, right):
+                    continue
+                text = inner
+                changed = True
+    return text.strip()
+
+
+def normalize_course_name(text):
+    """LLM 출력에서 코스명만 남김 (머리말, 따옴표, 설명 문장 제거)"""
+    text = unicodedata.normalize("NFKC", text or "").strip()
+    # "코스명:\n실제 이름"처럼 머리말만 있는 줄은 건너뛰고 처음 나오는 내용 줄을 사용
+    lines = [_LABEL.sub("", line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line and not _strip_wrappers(line).endswith(_LEAD_IN_ENDINGS)]
+    if not lines:
+        return ""
+
+    name = lines[0]
+    # '추천 코스명은 "..."입니다'처럼 따옴표 밖이 머리말/문장 끝맺음뿐이면 따옴표 안만 사용
+    # (AI로 설계하는 "미국 취업" 로드맵처럼 이름 일부에 따옴표가 있으면 그대로 둠)
+    quoted = _QUOTED.search(name)
+    if quoted:
+        before, after = name[:quoted.start()], name[quoted.end():]
+        if (before + after).strip() and _PROSE_BEFORE.fullmatch(before) and _PROSE_AFTER.fullmatch(after):
+            name = next(group for group in quoted.groups() if group is not None)
+    name = _strip_wrappers(name)
+    return " ".join(name.split())
+
+
+def _fingerprint(name):
+    """공백/대소문자/문장부호 차이를 무시한 비교용 문자열"""
+    return re.sub(r"[\W_]+", "", name.casefold())
+
+
+def prevalidate(name, previous_names=()):
+    """
+    규칙으로 걸러낼 수 있는 후보인지 확인
+
+    반환값: (통과 여부, 거부 사유) - 통과하면 사유는 None이고 LLM 검증으로 넘김
+    """
+    if not name:
+        return False, "빈 코스명"
+    if "\n" in name or name.endswith(_SENTENCE_ENDINGS):
+        return False, "코스명이 아니라 문장"
+    if name.endswith(_LEAD_IN_ENDINGS):
+        return False, "코스명이 아니라 머리말"
+    if len(name) < MIN_LENGTH:
+        return False, f"너무 짧음 ({len(name)}자 < {MIN_LENGTH}자)"
+    if len(name) > MAX_LENGTH:
+        return False, f"너무 김 ({len(name)}자 > {MAX_LENGTH}자)"
+    fingerprint = _fingerprint(name)
+    if not fingerprint:
+        return False, "글자가 없음"
+    if any(_fingerprint(previous) == fingerprint for previous in previous_names):
+        return False, "이전에 나온 코스명 반복"
+    return True, None
@@ -0,0 +1,191 @@
+"""
+코스명 생성 HTTP 서비스
+
+run_course_generator()는 호출할 때마다 그래프를 새로 만들고 컴파일함.
+서비스 모드에서는 시작할 때 그래프를 한 번만 컴파일하고, 모듈 전역 ChatOpenAI 클라이언트 하나
+(HTTP 연결 풀 포함)를 모든 요청이 같이 써서 요청마다 드는 비용이 LLM 호출 시간만 남도록 함.
+프로필/관심사가 같은 요청이 동시에 들어오면 실행 하나만 돌리고 결과를 같이 돌려줌.
+
+API:
+    POST /courses  {"user_profiles": [...], "user_interests": [...]}
+        -> {"course_name", "course_approved", "rounds", "decided_by", "coalesced", "elapsed"}
+    GET  /stats    요청 수, 합쳐진 요청 수, 실행 중인 요청 수, 지연 시간 p50/p99
+    GET  /health
+
+사용법:
+    python service.py                                   # http://127.0.0.1:8080
+    python service.py --port 9000 --cache course_cache.db
+"""
+import argparse
+import asyncio
+import functools
+import json
+import time
+from collections import deque
+
+from aiohttp import web
+
+from course_cache import CourseCache, cache_key
+from main import GRAPH_BUILDERS, create_cached_result, create_initial_state, get_compiled_graph, use_thread_pool
+
+# 지연 시간 통계에 쓰는 최근 요청 수
+LATENCY_SAMPLES = 1000
+# 동시에 실행할 수 있는 그래프 수 (노드가 동기 함수라서 이 크기의 스레드 풀에서 실행됨)
+DEFAULT_WORKERS = 64
+
+# 한글 코스명이 그대로 보이도록
+_dumps = functools.partial(json.dumps, ensure_ascii=False)
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CourseService:
+    """컴파일된 그래프 하나로 요청을 처리하고, 같은 요청이 동시에 오면 실행을 하나로 합침"""
+
+    def __init__(self, mode="batched", cache=None):
+        self.mode = mode
+        self.graph = get_compiled_graph(mode)
+        self.cache = cache
+        self._inflight = {}  # 요청 키 -> 실행 중인 Task
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def _generate(self, user_data):
+        if self.cache is not None:
+            hit = await asyncio.to_thread(self.cache.get, user_data)
+            if hit:
+                return create_cached_result(user_data, *hit)
+
+        result = await self.graph.ainvoke(create_initial_state(user_data))
+        if self.cache is not None and result["course_approved"]:
+            await asyncio.to_thread(self.cache.put, user_data, result["course_name"])
+        return result
+
+    async def generate(self, user_data):
+        """
+        코스명 생성 - 프로필/관심사(순서, 대소문자, 공백 무시)가 같은 요청이 실행 중이면 그 결과를 기다림
+
+        반환값: (그래프 결과 상태, 다른 요청과 합쳐졌는지 여부)
+        """
+        key = cache_key(user_data)
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._generate(user_data))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 기다리던 요청 하나가 취소(연결 끊김)되어도 공유 중인 실행은 계속되도록 shield
+        return await asyncio.shield(task), coalesced
+
+    def record(self, elapsed, coalesced, failed=False):
+        self.requests += 1
+        self.coalesced += coalesced
+        self.errors += failed
+        self._latencies.append(elapsed)
+
+    def stats(self):
+        latencies = list(self._latencies)
+        return {
+            "mode": self.mode,
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+            "latency_p50": round(_percentile(latencies, 0.5), 3),
+            "latency_p99": round(_percentile(latencies, 0.99), 3),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+SERVICE_KEY = web.AppKey("service", CourseService)
+
+
+def _parse_user_data(body):
+    """요청 본문 검사 - 문자열 목록 두 개가 있어야 함"""
+    if not isinstance(body, dict):
+        raise ValueError("JSON 객체가 필요합니다")
+    user_data = {}
+    for field in ("user_profiles", "user_interests"):
+        values = body.get(field)
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"{field}는 문자열 목록이어야 합니다")
+        user_data[field] = values
+    return user_data
+
+
+async def handle_courses(request):
+    service = request.app[SERVICE_KEY]
+    try:
+        user_data = _parse_user_data(await request.json())
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    started = time.perf_counter()
+    coalesced = False
+    try:
+        result, coalesced = await service.generate(user_data)
+    except Exception as e:
+        service.record(time.perf_counter() - started, coalesced, failed=True)
+        return web.json_response({"error": str(e)}, status=502)
+
+    elapsed = time.perf_counter() - started
+    service.record(elapsed, coalesced)
+    return web.json_response(
+        {
+            "course_name": result["course_name"],
+            "course_approved": result["course_approved"],
+            "rounds": result["rounds"],
+            "decided_by": result["decided_by"],
+            "coalesced": coalesced,
+            "elapsed": round(elapsed, 3),
+        },
+        dumps=_dumps,
+    )
+
+
+async def handle_stats(request):
+    return web.json_response(request.app[SERVICE_KEY].stats())
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+
+def create_app(mode="batched", cache=None, workers=DEFAULT_WORKERS):
+    """그래프를 한 번 컴파일한 서비스를 담은 aiohttp 앱 생성"""
+    app = web.Application()
+    app[SERVICE_KEY] = CourseService(mode=mode, cache=cache)
+
+    async def size_thread_pool(app):
+        # 기본 스레드 풀(min(32, CPU 수 + 4))에서 동시 요청이 막히지 않도록 workers 크기로 교체
+        use_thread_pool(workers)
+
+    app.on_startup.append(size_thread_pool)
+    app.router.add_post("/courses", handle_courses)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_get("/health", handle_health)
+    return app
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="코스명 생성 HTTP 서비스")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mode", choices=sorted(GRAPH_BUILDERS), default="batched", help="그래프 실행 모드")
+    parser.add_argument("--cache", default=None, help="코스명 캐시 SQLite 파일 (주면 승인된 코스명을 재사용)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="동시에 실행할 수 있는 그래프 수")
+    args = parser.parse_args()
+
+    cache = CourseCache(args.cache) if args.cache else None
+    web.run_app(create_app(args.mode, cache, args.workers), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main_cli()
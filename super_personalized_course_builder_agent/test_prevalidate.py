@@ -0,0 +1,40 @@
+import pytest
+
+from prevalidate import normalize_course_name, prevalidate
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        # 이름 일부에만 따옴표/괄호가 있으면 그대로 둠
+        ('AI로 설계하는 "미국 취업" 로드맵', 'AI로 설계하는 "미국 취업" 로드맵'),
+        ("Beginner's Guide to AI and Life's Reset", "Beginner's Guide to AI and Life's Reset"),
+        ("나만의 '스마트' 피클볼 & AI 여정", "나만의 '스마트' 피클볼 & AI 여정"),
+        ('"AI" 시대의 "커리어"', '"AI" 시대의 "커리어"'),
+        ("[AI] 커리어 [실전]", "[AI] 커리어 [실전]"),
+        ("<AI> for <Devs>", "<AI> for <Devs>"),
+        # 이름 전체를 감싼 따옴표/머리말/문장은 벗겨냄
+        ('"AI 여행 마스터"', "AI 여행 마스터"),
+        ("'Beginner's Guide to AI'", "Beginner's Guide to AI"),
+        ("**AI 여행**", "AI 여행"),
+        ('추천 코스명은 "AI 여행 마스터"입니다.', "AI 여행 마스터"),
+        ("과정명: 「AI 여행 마스터」", "AI 여행 마스터"),
+        # 머리말만 있는 줄은 건너뜀
+        ("코스명:\nAI와 함께하는 미국 취업 로드맵", "AI와 함께하는 미국 취업 로드맵"),
+        ('추천 코스명입니다:\n"AI 커리어 로드맵"', "AI 커리어 로드맵"),
+        ("**코스명:**\n\nAI 커리어 로드맵\n설명: ...", "AI 커리어 로드맵"),
+    ],
+)
+def test_normalize_course_name(raw, expected):
+    assert normalize_course_name(raw) == expected
+
+
+def test_normalized_names_pass_rules():
+    for raw in ['"AI" 시대의 "커리어"', "[AI] 커리어 [실전]", "코스명:\nAI와 함께하는 미국 취업 로드맵"]:
+        assert prevalidate(normalize_course_name(raw)) == (True, None)
+
+
+def test_prevalidate_rejects_lead_in():
+    passed, reason = prevalidate("추천 코스명입니다:")
+    assert not passed and "머리말" in reason
+    assert normalize_course_name("코스명:") == ""